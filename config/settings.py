@@ -71,6 +71,11 @@ class Settings:
     TELEGRAM_CHAT_ID = os.environ.get("TELEGRAM_CHAT_ID", "")
     LONGTITUDE_LATITUDE = os.environ.get("LONGTITUDE_LATITUDE", "")
 
+    # Scheduler settings: skip the Postgres LISTEN thread (tests, one-off scripts)
+    DISABLE_SCHEDULE_LISTENER = (
+        os.getenv("SAFE_FAMILY_DISABLE_SCHEDULE_LISTENER", "False") == "True"
+    )
+
     # Other settings can be added here as needed
     DISCORD_WEBHOOK_URL = os.environ.get("DISCORD_WEBHOOK_URL", "")
     HAMMERSPOON_ALERT_URL = os.environ.get(
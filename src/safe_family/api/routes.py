@@ -13,6 +13,7 @@ from flask_jwt_extended import (
     jwt_required,
 )
 from pydantic import ValidationError
+from sqlalchemy.orm import selectinload
 
 from config.settings import settings
 from src.safe_family.core.auth import consume_auth_code, require_api_key
@@ -170,6 +171,7 @@ def get_notes():
 
     notes = (
         Note.query.filter(Note.user_id == user_id, Note.deleted_at.is_(None))
+        .options(selectinload(Note.tags), selectinload(Note.media))
         .order_by(Note.updated_at.desc())
         .limit(limit)
         .all()
@@ -2,7 +2,6 @@
 
 import atexit
 import logging
-import os
 import select
 import threading
 import time
@@ -15,6 +14,7 @@ from apscheduler.events import EVENT_JOB_ERROR, EVENT_JOB_EXECUTED, JobExecution
 from apscheduler.schedulers.background import BackgroundScheduler
 from flask import Blueprint, flash, redirect, render_template, request, url_for
 
+from config.settings import settings
 from src.safe_family.auto_git.auto_git import rule_auto_commit
 from src.safe_family.core.auth import admin_required
 from src.safe_family.core.extensions import get_db_connection, local_tz
@@ -240,7 +240,10 @@ def _listen_for_schedule_changes() -> None:
 
 def _start_schedule_listener() -> None:
     """Start a background listener for schedule change notifications."""
-    if os.environ.get("PYTEST_CURRENT_TEST"):
+    if settings.DISABLE_SCHEDULE_LISTENER:
+        logger.info(
+            "Schedule listener disabled; schedule changes need a restart to apply.",
+        )
         return
     global _LISTENER_THREAD  # noqa: PLW0603 - single listener thread per process
     with _LISTENER_LOCK:
@@ -1,39 +1,89 @@
 """Pytest fixtures for SafeFamily tests."""
 
+import os
+
+# The scheduler starts its LISTEN thread when first imported, so opt out
+# before anything below pulls in ``config.settings``.
+os.environ["SAFE_FAMILY_DISABLE_SCHEDULE_LISTENER"] = "True"
+
+import functools
+import sqlite3
+import tempfile
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
 from types import SimpleNamespace
 
 import pytest
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event, orm
+from werkzeug.security import generate_password_hash
 
 from src.safe_family.app import create_app
 from src.safe_family.core.extensions import db
+from src.safe_family.core.models import Note, User
+
+
+def pytest_collection_modifyitems(config, items):
+    """Deselect ``postgres`` tests unless ``PG_DSN`` points at a server."""
+    if os.environ.get("PG_DSN"):
+        return
+    deselected = [item for item in items if item.get_closest_marker("postgres")]
+    if deselected:
+        config.hook.pytest_deselected(items=deselected)
+        items[:] = [item for item in items if not item.get_closest_marker("postgres")]
+
+
+_EMPTY = ()
 
 
 class FakeCursor:
-    """Minimal DB cursor stub that records executed statements."""
+    """DB cursor stub that records executed statements.
+
+    ``executed`` lists every ``(sql, params)`` pair. ``fetchall`` returns a
+    new list of ``rows``, as psycopg2 does, and ``fetchone`` its first row,
+    unless results were queued with ``fetchone_values``/``fetchall_values``;
+    queued results are handed out in order from a deque.
+    """
 
-    def __init__(self, rows=None):
-        self.queries = []
-        self._rows = rows or []
+    def __init__(self, rows=None, *, fetchone_values=(), fetchall_values=()):
+        self.executed = []
+        self._rows = rows or _EMPTY
+        # Most cursors queue nothing, so skip building empty deques.
+        self.fetchone_values = deque(fetchone_values) if fetchone_values else None
+        self.fetchall_values = deque(fetchall_values) if fetchall_values else None
 
     def execute(self, sql, params=None):
-        self.queries.append((sql, params))
+        self.executed.append((sql, params))
 
     def fetchone(self):
+        if self.fetchone_values:
+            return self.fetchone_values.popleft()
         return self._rows[0] if self._rows else (0,)
 
     def fetchall(self):
-        return self._rows
+        if self.fetchall_values:
+            return self.fetchall_values.popleft()
+        return list(self._rows)
 
     def close(self):
         return None
 
 
 class FakeConnection:
-    """Minimal DB connection stub returning FakeCursor."""
+    """Minimal DB connection stub returning one shared ``FakeCursor``.
+
+    Pass ``cursor`` to use a custom cursor; other keyword arguments build
+    the default ``FakeCursor``.
+    """
 
-    def __init__(self, rows=None):
-        self.cursor_obj = FakeCursor(rows)
+    def __init__(self, rows=None, *, cursor=None, autocommit=False, **cursor_kwargs):
+        self.cursor_obj = cursor or FakeCursor(rows, **cursor_kwargs)
+        self.autocommit = autocommit
         self.commits = 0
+        self.closed = 0
 
     def cursor(self):
         return self.cursor_obj
@@ -42,88 +92,555 @@ class FakeConnection:
         self.commits += 1
 
     def close(self):
-        return None
+        self.closed += 1
+
+
+@contextmanager
+def conn_slot(module):
+    """Patch ``module.get_db_connection`` to hand out a settable connection.
+
+    Yields a setter that makes ``conn`` the module's connection; pass
+    ``None`` to clear it between tests.
+    """
+    slot = SimpleNamespace(conn=None)
+
+    def _use(conn):
+        slot.conn = conn
+        return conn
+
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(module, "get_db_connection", lambda: slot.conn)
+        yield _use
+
+
+class SqliteCursor:
+    """psycopg2-style cursor over sqlite3 (``%s`` placeholders)."""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    def execute(self, sql, params=()):
+        self._cursor.execute(sql.replace("%s", "?"), params)
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def close(self):
+        self._cursor.close()
+
+
+class SqliteConnection:
+    """psycopg2-style connection onto the shared in-memory test database."""
+
+    def __init__(self, db):
+        self.db = db
+        self.commits = 0
+
+    def cursor(self):
+        return SqliteCursor(self.db.cursor())
+
+    def commit(self):
+        self.commits += 1
+        self.db.commit()
+
+    def rollback(self):
+        self.db.rollback()
+
+    def close(self):
+        """Keep the database open so tests can inspect it afterwards."""
+
+
+# Portable subset of the Postgres tables the raw-SQL routes write to.
+SQLITE_SCHEMA = {
+    "logs": (
+        "CREATE TABLE logs (id INTEGER PRIMARY KEY, timestamp TIMESTAMP,"
+        " ip TEXT UNIQUE, qh TEXT, is_filtered BOOLEAN)"
+    ),
+    "filter_rule": "CREATE TABLE filter_rule (qh TEXT PRIMARY KEY)",
+    "block_list": "CREATE TABLE block_list (id INTEGER PRIMARY KEY, qh TEXT UNIQUE, type TEXT)",
+}
+
+
+@pytest.fixture(scope="session")
+def pg_connect():
+    """Open real connections to ``PG_DSN`` (``postgres``-marked tests only)."""
+    import psycopg2
+
+    return functools.partial(psycopg2.connect, os.environ["PG_DSN"])
+
+
+@pytest.fixture(scope="session")
+def _sqlite_db():
+    """One in-memory database per pytest-xdist worker process; no files to clean up."""
+    db = sqlite3.connect(":memory:")
+    for ddl in SQLITE_SCHEMA.values():
+        db.execute(ddl)
+    yield db
+    db.close()
 
 
 @pytest.fixture
-def app(monkeypatch):
-    """Flask application with patched DB connection."""
-    fake_conn = FakeConnection()
+def sqlite_conn(_sqlite_db):
+    """Connection onto the session's in-memory SQLite, emptied for this test."""
+    for table in SQLITE_SCHEMA:
+        _sqlite_db.execute(f"DELETE FROM {table}")  # noqa: S608 - fixed table names
+    _sqlite_db.commit()
+    return SqliteConnection(_sqlite_db)
+
+
+class FakeSession:
+    """Record ORM session calls made through ``models.db.session``."""
+
+    def __init__(self):
+        self.added = []
+        self.deleted = []
+        self.commits = 0
+
+    def reset(self):
+        self.added.clear()
+        self.deleted.clear()
+        self.commits = 0
+
+    def add(self, obj):
+        self.added.append(obj)
+
+    def delete(self, obj):
+        self.deleted.append(obj)
+
+    def commit(self):
+        self.commits += 1
+
+
+# Tokens never expire in tests, so flask_jwt_extended skips exp/nbf math.
+TEST_JWT_CONFIG = {
+    "JWT_ALGORITHM": "HS256",
+    "JWT_SECRET_KEY": "test-secret",
+    "JWT_ACCESS_TOKEN_EXPIRES": False,
+    "JWT_REFRESH_TOKEN_EXPIRES": False,
+}
+
+
+@pytest.fixture(scope="session")
+def _flask_app():
+    """Build the Flask app once; blueprint and Jinja setup is not per test."""
     from src.safe_family import core
 
-    monkeypatch.setattr(core.extensions, "get_db_connection", lambda: fake_conn)
-    monkeypatch.setattr(
-        "config.settings.settings.SQLALCHEMY_DATABASE_URI",
-        "sqlite:///:memory:",
-    )
-    flask_app = create_app()
+    fake_conn = FakeConnection()
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(core.extensions, "get_db_connection", lambda: fake_conn)
+        mp.setattr("config.settings.settings.SQLALCHEMY_DATABASE_URI", "sqlite:///:memory:")
+        flask_app = create_app()
     flask_app.config["SECRET_KEY"] = "test"
-    with flask_app.app_context():
-        yield flask_app
+    flask_app.config.update(TEST_JWT_CONFIG)
+    return flask_app
+
+
+@pytest.fixture
+def app(_flask_app):
+    """Flask application inside a fresh app context for each test."""
+    with _flask_app.app_context():
+        yield _flask_app
 
 
 @pytest.fixture
 def client(app):
-    """Flask test client."""
+    """Flask test client with its own, empty cookie jar."""
     return app.test_client()
 
 
-@pytest.fixture
-def notesync_app(tmp_path, monkeypatch):
-    """Flask application configured for notesync tests."""
-    db_path = tmp_path / "notesync.db"
-    monkeypatch.setattr(
-        "config.settings.settings.SQLALCHEMY_DATABASE_URI",
-        f"sqlite:///{db_path}",
-    )
-    monkeypatch.setattr(
-        "config.settings.settings.JWT_SECRET_KEY",
-        "test-secret",
-    )
-    monkeypatch.setattr(
-        "config.settings.settings.NOTESYNC_API_KEY",
-        "test-api-key",
-    )
-    app = create_app()
+@pytest.fixture(scope="session")
+def stateless_client(_flask_app):
+    """Cookie-less test client shared by tests that never use the session."""
+    return _flask_app.test_client(use_cookies=False)
+
+
+SEEDED_USER_IDS = ("u-notes", "u-media", "u-media2", "u-owner", "u-viewer")
+# scrypt is deliberately slow; tests only need hashes that round-trip.
+FAST_HASH_METHOD = "pbkdf2:sha256:1"
+SECRET_HASH = generate_password_hash("secret", method=FAST_HASH_METHOD)
+
+
+@pytest.fixture(autouse=True, scope="session")
+def _fast_password_hashing():
+    """Make ``User.set_password`` hash with a single PBKDF2 iteration.
+
+    ``check_password_hash`` reads the method from the stored hash, so
+    verification needs no patching.
+    """
+    from src.safe_family.core import models
+
+    fast_hash = functools.partial(generate_password_hash, method=FAST_HASH_METHOD)
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(models, "generate_password_hash", fast_hash)
+        yield
+
+
+@dataclass(frozen=True, slots=True)
+class UserView:
+    """Read-only stand-in for the user returned by ``get_current_username``."""
+
+    username: str
+    role: str = "user"
+
+
+def make_user(user_id, username, email):
+    """Build a ``User`` whose password is "secret" without re-hashing it."""
+    return User(id=user_id, username=username, email=email, password_hash=SECRET_HASH)
+
+
+def freeze_now(monkeypatch, module, moment):
+    """Make ``module.datetime.now()`` return ``moment``; the rest of ``datetime`` is real."""
+
+    class FrozenDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return moment
+
+    monkeypatch.setattr(module, "datetime", FrozenDatetime)
+    return moment
+
+
+# Shared timestamp for notes and sync payloads that need no real clock.
+FIXED_NOW = datetime(2025, 1, 1)
+
+_NOTE_DEFAULTS = {"is_pinned": False, "deleted_at": None}
+
+
+def make_note(note_id, user_id, text, created_at, **overrides):
+    """Build a live, unpinned ``Note``; ``updated_at`` defaults to ``created_at``."""
+    fields = {**_NOTE_DEFAULTS, "updated_at": created_at, **overrides}
+    return Note(id=note_id, user_id=user_id, text=text, created_at=created_at, **fields)
+
+
+def _configure_sqlite(engine):
+    """Tune the test SQLite engine for speed and correct SAVEPOINT nesting.
+
+    pysqlite's own transaction handling is disabled so SQLAlchemy emits BEGIN
+    itself, and durability is traded away since the database is throwaway.
+    """
+
+    @event.listens_for(engine, "connect")
+    def _connect(dbapi_connection, _record):
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA synchronous=OFF")
+        cursor.execute("PRAGMA journal_mode=MEMORY")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.close()
+
+    @event.listens_for(engine, "begin")
+    def _begin(connection):
+        connection.exec_driver_sql("BEGIN")
+
+
+@pytest.fixture(scope="session")
+def notesync_engine():
+    """Build the notesync app, schema and seeded users once per session.
+
+    The database is in-memory; Flask-SQLAlchemy pairs that with a
+    ``StaticPool`` so every session shares the one connection. Each
+    pytest-xdist worker is its own process, so each gets a private copy.
+    """
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(
+            "config.settings.settings.SQLALCHEMY_DATABASE_URI",
+            "sqlite:///:memory:",
+        )
+        app = create_app()
     app.config["TESTING"] = True
     app.config["SECRET_KEY"] = "test"
+    app.config.update(TEST_JWT_CONFIG)
     with app.app_context():
+        _configure_sqlite(db.engine)
         db.create_all()
-        yield app
+        db.session.add_all(
+            make_user(user_id, user_id, f"{user_id}@example.com")
+            for user_id in SEEDED_USER_IDS
+        )
+        db.session.commit()
         db.session.remove()
+    yield app
+    with app.app_context():
         db.drop_all()
 
 
+@pytest.fixture
+def notesync_app(notesync_engine, monkeypatch):
+    """Notesync app whose DB work is rolled back after each test.
+
+    ``db.session`` is swapped for one bound to a single connection inside an
+    outer transaction, joining it through a SAVEPOINT, so application commits
+    stay visible to the test but never outlive it. An application-level
+    rollback only unwinds that SAVEPOINT; ``join_transaction_mode`` re-opens
+    one as needed, which replaces the pre-2.0 ``after_transaction_end``
+    recipe. A plain SQLAlchemy ``Session`` is used because Flask-SQLAlchemy's
+    own resolves its bind from the engine map and would ignore ``bind``.
+    """
+    monkeypatch.setattr(
+        "config.settings.settings.NOTESYNC_API_KEY",
+        "test-api-key",
+    )
+    with notesync_engine.app_context():
+        connection = db.engine.connect()
+        transaction = connection.begin()
+        session = orm.scoped_session(
+            orm.sessionmaker(
+                bind=connection,
+                join_transaction_mode="create_savepoint",
+                query_cls=db.Query,
+            ),
+        )
+        monkeypatch.setattr(db, "session", session)
+        yield notesync_engine
+        session.remove()
+        transaction.rollback()
+        connection.close()
+
+
+@functools.lru_cache(maxsize=64)
+def _token_for(app, user_id):
+    """Sign one access token per app and user; tokens never expire in tests."""
+    with app.app_context():
+        return create_access_token(identity=user_id)
+
+
+def auth_headers(app, user_id, api_key="test-api-key"):
+    """Build notesync request headers with a bearer token and API key."""
+    return {
+        "Authorization": f"Bearer {_token_for(app, user_id)}",
+        "X-API-Key": api_key,
+    }
+
+
+# Session tokens that the patched ``auth.decode_token`` accepts without a JWT.
+FAKE_SESSION_CLAIMS = {
+    "admin": {"sub": "admin", "is_admin": "admin"},
+    "user": {"sub": "user"},
+}
+
+
+@pytest.fixture(autouse=True, scope="session")
+def _fake_session_tokens():
+    """Let ``login`` tokens through the session auth decorators.
+
+    Any other token still goes to the real ``decode_token``, so JWT-backed
+    login flows behave as before; tests may still patch it themselves.
+    """
+    from src.safe_family.core import auth
+
+    real_decode = auth.decode_token
+
+    def _decode(token, *args, **kwargs):
+        claims = FAKE_SESSION_CLAIMS.get(token)
+        return dict(claims) if claims is not None else real_decode(token, *args, **kwargs)
+
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(auth, "decode_token", _decode)
+        yield
+
+
+@functools.lru_cache(maxsize=32)
+def _session_cookie(app, identity):
+    """Sign a session holding ``access_token=identity`` once per app."""
+    serializer = app.session_interface.get_signing_serializer(app)
+    return serializer.dumps({"access_token": identity})
+
+
+def login(client, identity="user"):
+    """Give ``client`` a session whose ``access_token`` is ``identity``.
+
+    ``"admin"`` and ``"user"`` are accepted by the session-wide fake
+    ``decode_token`` (see ``FAKE_SESSION_CLAIMS``); tests that patch
+    ``decode_token`` themselves may pass any token. Replaces the client's
+    whole session cookie with a cached signed one.
+    """
+    app = client.application
+    client.set_cookie(app.config["SESSION_COOKIE_NAME"], _session_cookie(app, identity))
+    return client
+
+
+def stub_render(*_args, **_kwargs):
+    """Stand-in for ``render_template`` when a test only checks the status."""
+    return "ok", 200
+
+
+@pytest.fixture(scope="module")
+def _todo_conn_slot():
+    """Patch ``todo.get_db_connection`` once per module.
+
+    The todo test modules apply it to every test via ``pytestmark``.
+    """
+    from src.safe_family.todo import todo
+
+    with conn_slot(todo) as use_conn:
+        yield use_conn
+
+
+@pytest.fixture
+def use_todo_conn(_todo_conn_slot):
+    """Return a setter that makes ``conn`` the todo views' connection."""
+    yield _todo_conn_slot
+    _todo_conn_slot(None)
+
+
+def _ignore(*_args, **_kwargs):
+    """No-op stand-in for flashing and outbound notifications."""
+
+
+# Side effects of the todo views that tests patch back in when they count them.
+SILENCED_TODO_CALLS = ("flash", "send_discord_notification", "send_email_notification")
+
+
+@pytest.fixture(scope="module")
+def _silence_todo_side_effects():
+    """Turn the todo views' flashes and notifications into no-ops per module.
+
+    The todo test modules apply it to every test via ``pytestmark``.
+    """
+    from src.safe_family.todo import todo
+
+    with pytest.MonkeyPatch.context() as mp:
+        for name in SILENCED_TODO_CALLS:
+            mp.setattr(todo, name, _ignore)
+        yield
+
+
+def assert_sql(executed, needle):
+    """Assert some recorded ``(sql, params)`` statement contains ``needle``."""
+    statements = [sql for sql, _ in executed]
+    assert any(needle in sql for sql in statements), f"{needle!r} not in {statements}"
+
+
+def sql_params(executed, needle):
+    """Return the params of every recorded statement containing ``needle``, in order."""
+    return [params for sql, params in executed if needle in sql]
+
+
+@contextmanager
+def count_queries(connection):
+    """Collect every SQL statement executed on ``connection`` inside the block."""
+    statements = []
+
+    def _record(_conn, _cursor, statement, *_args):
+        statements.append(statement)
+
+    event.listen(connection, "before_cursor_execute", _record)
+    try:
+        yield statements
+    finally:
+        event.remove(connection, "before_cursor_execute", _record)
+
+
 @pytest.fixture
 def notesync_client(notesync_app):
     """Flask test client for notesync endpoints."""
     return notesync_app.test_client()
 
 
+@pytest.fixture(scope="session")
+def _fake_session():
+    return FakeSession()
+
+
+@pytest.fixture
+def fake_db_session(_fake_session, monkeypatch):
+    """Route ``models.db.session`` to a reset, shared ``FakeSession``."""
+    from src.safe_family.core import models
+
+    _fake_session.reset()
+    monkeypatch.setattr(models, "db", SimpleNamespace(session=_fake_session))
+    return _fake_session
+
+
 @pytest.fixture
 def fake_db():
     """Provide a fresh fake DB connection and cursor."""
     return FakeConnection()
 
 
+@dataclass
+class RequestCalls:
+    """Count intercepted ``requests`` calls, keeping the first and last one."""
+
+    count: int = 0
+    first: SimpleNamespace | None = None
+    last: SimpleNamespace | None = None
+
+    @property
+    def last_url(self):
+        return self.last.args[0] if self.last else None
+
+
 @pytest.fixture
 def patch_requests(monkeypatch):
-    """Patch requests.post/get to prevent network calls."""
-    calls = []
+    """Patch requests.post/get/put/options to prevent network calls."""
+    calls = RequestCalls()
 
     def _record(method, *args, **kwargs):
-        calls.append(SimpleNamespace(method=method, args=args, kwargs=kwargs, status_code=200, text="ok"))
-        return calls[-1]
+        call = SimpleNamespace(method=method, args=args, kwargs=kwargs, status_code=200, text="ok")
+        calls.count += 1
+        if calls.first is None:
+            calls.first = call
+        calls.last = call
+        return call
 
     monkeypatch.setattr("requests.post", lambda *a, **kw: _record("post", *a, **kw))
     monkeypatch.setattr("requests.get", lambda *a, **kw: _record("get", *a, **kw))
     monkeypatch.setattr("requests.put", lambda *a, **kw: _record("put", *a, **kw))
+    monkeypatch.setattr("requests.options", lambda *a, **kw: _record("options", *a, **kw))
     monkeypatch.setattr("requests.Session.post", lambda self, *a, **kw: _record("post", *a, **kw))
     monkeypatch.setattr("requests.Session.get", lambda self, *a, **kw: _record("get", *a, **kw))
     monkeypatch.setattr("requests.Session.put", lambda self, *a, **kw: _record("put", *a, **kw))
+    monkeypatch.setattr("requests.Session.options", lambda self, *a, **kw: _record("options", *a, **kw))
     return calls
 
 
+class CliRunner:
+    """Invoke CLI ``main(argv)`` entrypoints in-process by short name."""
+
+    def __init__(self, modules):
+        self.modules = modules
+
+    def invoke(self, name, args):
+        return self.modules[name].main(args)
+
+
+@pytest.fixture(scope="session")
+def cli_runner():
+    """Resolve the CLI modules once and share the runner across the session."""
+    from src.safe_family.cli import analyze, weekly_metrics
+
+    return CliRunner({"analyze": analyze, "weekly_metrics": weekly_metrics})
+
+
+@pytest.fixture(scope="session")
+def user_stub():
+    """Build a stand-in for ``User`` whose ``query.get`` returns ``fake_user``."""
+
+    def _build(fake_user):
+        return SimpleNamespace(query=SimpleNamespace(get=lambda _user_id: fake_user))
+
+    return _build
+
+
+@pytest.fixture(scope="session")
+def _tmp_out_base(tmp_path_factory):
+    return tmp_path_factory.mktemp("out")
+
+
+@pytest.fixture
+def tmp_out(_tmp_out_base):
+    """Per-test output directory carved out of one session-scoped base dir."""
+    return Path(tempfile.mkdtemp(dir=_tmp_out_base))
+
+
 @pytest.fixture
 def patch_mail(monkeypatch):
     """Patch Flask-Mail send to capture messages."""
@@ -4,9 +4,10 @@ from datetime import datetime
 
 import pandas as pd
 
-from src.safe_family.core import auth
 from src.safe_family.urls import analyzer
 
+from .conftest import assert_sql, login, stub_render
+
 
 class AnalysisCursor:
     """Cursor stub for log_analysis."""
@@ -56,28 +57,22 @@ def test_log_analysis_inserts(monkeypatch):
 
     analyzer.log_analysis(start, end)
 
-    assert any("logs_daily" in sql for sql, _ in cursor.executed)
-    assert any("suspicious" in sql for sql, _ in cursor.executed)
+    assert_sql(cursor.executed, "logs_daily")
+    assert_sql(cursor.executed, "suspicious")
     assert conn.commits >= 1
 
 
-def test_analyze_logs_invalid_time_range(client, monkeypatch):
-    monkeypatch.setattr(
-        auth,
-        "decode_token",
-        lambda token: {"sub": "admin", "is_admin": "admin"},
-    )
-    with client.session_transaction() as sess:
-        sess["access_token"] = "token"
+def test_analyze_logs_invalid_time_range(client):
+    login(client, "admin")
 
     resp = client.post("/analyze", json={"time_range": "invalid"})
 
     assert resp.status_code == 400
 
 
-def test_analyze_routes_page(client, monkeypatch):
-    monkeypatch.setattr(analyzer, "render_template", lambda *a, **k: ("ok", 200))
+def test_analyze_routes_page(stateless_client, monkeypatch):
+    monkeypatch.setattr(analyzer, "render_template", stub_render)
 
-    resp = client.get("/analyze_route")
+    resp = stateless_client.get("/analyze_route")
 
     assert resp.status_code == 200
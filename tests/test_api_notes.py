@@ -2,30 +2,23 @@
 
 from datetime import datetime, timedelta
 
-from flask_jwt_extended import create_access_token
-
 from src.safe_family.core.extensions import db
-from src.safe_family.core.models import Note, User
+from src.safe_family.core.models import Media, Note, Tag, User
+
+from .conftest import auth_headers, count_queries, make_user
 
 
 def _create_user(user_id="user-1"):
-    user = User(id=user_id, username="alice", email="a@example.com")
-    user.set_password("secret")
+    user = make_user(user_id, "alice", "a@example.com")
     db.session.add(user)
     db.session.commit()
     return user
 
 
-def _auth_headers(app, user_id, api_key="test-api-key"):
-    with app.app_context():
-        token = create_access_token(identity=user_id)
-    return {"Authorization": f"Bearer {token}", "X-API-Key": api_key}
-
-
 def test_notesync_rejects_invalid_request(notesync_app, notesync_client):
     with notesync_app.app_context():
         _create_user("u-json")
-    headers = _auth_headers(notesync_app, "u-json")
+    headers = auth_headers(notesync_app, "u-json")
     resp = notesync_client.post(
         "/api/notesync",
         json={"ops": "bad"},
@@ -39,7 +32,7 @@ def test_notesync_rejects_invalid_base64(notesync_app, notesync_client):
     now = datetime.utcnow().isoformat()
     with notesync_app.app_context():
         _create_user("u-base64")
-    headers = _auth_headers(notesync_app, "u-base64")
+    headers = auth_headers(notesync_app, "u-base64")
     resp = notesync_client.post(
         "/api/notesync",
         json={
@@ -74,12 +67,15 @@ def test_notesync_rejects_invalid_base64(notesync_app, notesync_client):
     )
     assert resp.status_code == 400
     assert resp.get_json()["error"] == "invalid_base64"
+    # The route's rollback must only unwind its own savepoint.
+    with notesync_app.app_context():
+        assert db.session.get(User, "u-base64") is not None
 
 
 def test_get_notes_rejects_invalid_limit(notesync_app, notesync_client):
     with notesync_app.app_context():
         _create_user("u-limit")
-    headers = _auth_headers(notesync_app, "u-limit")
+    headers = auth_headers(notesync_app, "u-limit")
     resp = notesync_client.get("/api/notes?limit=0", headers=headers)
     assert resp.status_code == 400
     assert resp.get_json()["error"] == "invalid_limit"
@@ -88,7 +84,7 @@ def test_get_notes_rejects_invalid_limit(notesync_app, notesync_client):
 def test_get_notes_rejects_non_numeric_limit(notesync_app, notesync_client):
     with notesync_app.app_context():
         _create_user("u-limit2")
-    headers = _auth_headers(notesync_app, "u-limit2")
+    headers = auth_headers(notesync_app, "u-limit2")
     resp = notesync_client.get("/api/notes?limit=abc", headers=headers)
     assert resp.status_code == 400
     assert resp.get_json()["error"] == "invalid_limit"
@@ -97,7 +93,7 @@ def test_get_notes_rejects_non_numeric_limit(notesync_app, notesync_client):
 def test_get_notes_requires_identity(notesync_app, notesync_client, monkeypatch):
     with notesync_app.app_context():
         _create_user("u-none")
-    headers = _auth_headers(notesync_app, "u-none")
+    headers = auth_headers(notesync_app, "u-none")
     monkeypatch.setattr("src.safe_family.api.routes.get_jwt_identity", lambda: None)
 
     resp = notesync_client.get("/api/notes?limit=1", headers=headers)
@@ -106,10 +102,10 @@ def test_get_notes_requires_identity(notesync_app, notesync_client, monkeypatch)
 
 
 def test_get_notes_returns_recent_notes(notesync_app, notesync_client):
-    user_id = "u-notes"
+    user_id = "u-recent"
     now = datetime.utcnow()
     with notesync_app.app_context():
-        _create_user(user_id)
+        user = make_user(user_id, "alice", "a@example.com")
         newer = Note(
             id="n1",
             user_id=user_id,
@@ -128,12 +124,57 @@ def test_get_notes_returns_recent_notes(notesync_app, notesync_client):
             updated_at=now,
             deleted_at=now,
         )
-        db.session.add_all([newer, deleted])
+        db.session.add_all([user, newer, deleted])
         db.session.commit()
-    headers = _auth_headers(notesync_app, user_id)
+    headers = auth_headers(notesync_app, user_id)
     resp = notesync_client.get("/api/notes?limit=10", headers=headers)
     assert resp.status_code == 200
     data = resp.get_json()
     assert len(data["notes"]) == 1
     assert data["notes"][0]["id"] == "n1"
     assert data["media"] == []
+
+
+def test_get_notes_eager_loads_tags_and_media(notesync_app, notesync_client):
+    user_id = "u-eager"
+    now = datetime.utcnow()
+    with notesync_app.app_context():
+        rows = [make_user(user_id, "alice", "a@example.com")]
+        for i in range(3):
+            note = Note(
+                id=f"n-eager-{i}",
+                user_id=user_id,
+                text=f"note {i}",
+                is_pinned=False,
+                created_at=now,
+                updated_at=now + timedelta(minutes=i),
+                deleted_at=None,
+            )
+            note.tags.append(Tag(id=f"t-eager-{i}", user_id=user_id, name=f"tag{i}"))
+            rows.append(note)
+            rows.append(
+                Media(
+                    id=f"m-eager-{i}",
+                    note_id=note.id,
+                    user_id=user_id,
+                    kind="image",
+                    filename="photo.jpg",
+                    content_type="image/jpeg",
+                    checksum=f"sha256:{i}",
+                    data=b"bytes",
+                    created_at=now,
+                ),
+            )
+        db.session.add_all(rows)
+        db.session.commit()
+    headers = auth_headers(notesync_app, user_id)
+
+    with count_queries(db.engine) as statements:
+        resp = notesync_client.get("/api/notes?limit=10", headers=headers)
+
+    assert resp.status_code == 200
+    data = resp.get_json()
+    assert len(data["notes"]) == 3
+    assert len(data["media"]) == 3
+    # User lookup, notes, then one selectin query each for tags and media.
+    assert sum(1 for sql in statements if sql.lstrip().startswith("SELECT")) <= 4
@@ -4,10 +4,7 @@ from types import SimpleNamespace
 
 from src.safe_family.core import auth
 
-
-def _set_session_token(client):
-    with client.session_transaction() as sess:
-        sess["access_token"] = "token"
+from .conftest import login
 
 
 def test_login_required_redirects_without_token():
@@ -25,13 +22,8 @@ def test_login_required_redirects_without_token():
         assert "/auth/login-ui" in resp.location
 
 
-def test_admin_required_blocks_non_admin(client, monkeypatch):
-    monkeypatch.setattr(
-        auth,
-        "decode_token",
-        lambda token: {"sub": "user", "is_admin": "user"},
-    )
-    _set_session_token(client)
+def test_admin_required_blocks_non_admin(client):
+    login(client, "user")
 
     resp = client.get("/rules_toggle/enable_all")
     assert resp.status_code == 302
@@ -2,12 +2,12 @@
 
 from src.safe_family.core.auth import create_auth_code
 from src.safe_family.core.extensions import db
-from src.safe_family.core.models import User
+
+from .conftest import make_user
 
 
 def _create_user(user_id="u1"):
-    user = User(id=user_id, username="alice", email="a@a.com")
-    user.set_password("secret")
+    user = make_user(user_id, "alice", "a@a.com")
     db.session.add(user)
     db.session.commit()
     return user
@@ -65,17 +65,12 @@ def test_login_user_success(client, monkeypatch):
     assert tokens["refresh_token"] == "refresh"
 
 
-def test_change_password_success(client, monkeypatch):
+def test_change_password_success(client, monkeypatch, user_stub):
     _bypass_jwt(monkeypatch)
     monkeypatch.setattr(auth, "get_jwt_identity", lambda: "u1")
 
     fake_user = SimpleNamespace(change_password=lambda old, new: True)
-    monkeypatch.setattr(
-        auth,
-        "User",
-        SimpleNamespace(query=SimpleNamespace(get=lambda user_id: fake_user)),
-        raising=False,
-    )
+    monkeypatch.setattr(auth, "User", user_stub(fake_user), raising=False)
 
     resp = client.post(
         "/auth/change-password",
@@ -84,17 +79,12 @@ def test_change_password_success(client, monkeypatch):
     assert resp.status_code == 200
 
 
-def test_change_password_invalid_old(client, monkeypatch):
+def test_change_password_invalid_old(client, monkeypatch, user_stub):
     _bypass_jwt(monkeypatch)
     monkeypatch.setattr(auth, "get_jwt_identity", lambda: "u1")
 
     fake_user = SimpleNamespace(change_password=lambda old, new: False)
-    monkeypatch.setattr(
-        auth,
-        "User",
-        SimpleNamespace(query=SimpleNamespace(get=lambda user_id: fake_user)),
-        raising=False,
-    )
+    monkeypatch.setattr(auth, "User", user_stub(fake_user), raising=False)
 
     resp = client.post(
         "/auth/change-password",
@@ -179,19 +169,14 @@ def test_oauth_start_renders_page(client):
     assert "Continue with a provider" in resp.get_data(as_text=True)
 
 
-def test_get_current_username_sets_role(monkeypatch):
+def test_get_current_username_sets_role(monkeypatch, user_stub):
     monkeypatch.setattr(
         auth,
         "decode_token",
         lambda token: {"sub": "u1", "is_admin": "user"},
     )
     fake_user = SimpleNamespace(id="u1", username="alice", role="admin", email="a@a.com")
-    monkeypatch.setattr(
-        auth,
-        "User",
-        SimpleNamespace(query=SimpleNamespace(get=lambda user_id: fake_user)),
-        raising=False,
-    )
+    monkeypatch.setattr(auth, "User", user_stub(fake_user), raising=False)
     app = Flask(__name__)
     app.secret_key = "test"
     with app.test_request_context("/"):
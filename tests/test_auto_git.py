@@ -1,10 +1,11 @@
 """Tests for auto_git utilities."""
 
 from src.safe_family.auto_git import auto_git
-from src.safe_family.core import auth
 
+from .conftest import assert_sql, login
 
-def test_rule_auto_commit_writes_files(monkeypatch, tmp_path):
+
+def test_rule_auto_commit_writes_files(monkeypatch, tmp_out):
     class AutoCursor:
         def __init__(self):
             self.calls = 0
@@ -30,7 +31,7 @@ def test_rule_auto_commit_writes_files(monkeypatch, tmp_path):
 
     conn = AutoConn()
     monkeypatch.setattr(auto_git, "get_db_connection", lambda: conn)
-    monkeypatch.setattr(auto_git.settings, "ADGUARD_RULE_PATH", str(tmp_path) + "/")
+    monkeypatch.setattr(auto_git.settings, "ADGUARD_RULE_PATH", str(tmp_out) + "/")
     monkeypatch.setattr(auto_git.shutil, "which", lambda cmd: "/usr/bin/git")
     calls = []
     monkeypatch.setattr(
@@ -41,16 +42,16 @@ def test_rule_auto_commit_writes_files(monkeypatch, tmp_path):
 
     auto_git.rule_auto_commit()
 
-    block_file = tmp_path / "block_game.txt"
+    block_file = tmp_out / "block_game.txt"
     assert block_file.exists()
     content = block_file.read_text()
     assert "||examplecom^" in content
-    filter_file = tmp_path / "filter.txt"
+    filter_file = tmp_out / "filter.txt"
     assert filter_file.exists()
     assert calls
 
 
-def test_auto_import_inserts_blocks(client, monkeypatch, tmp_path):
+def test_auto_import_inserts_blocks(client, monkeypatch, tmp_out):
     class ImportCursor:
         def __init__(self):
             self.queries = []
@@ -79,21 +80,15 @@ def test_auto_import_inserts_blocks(client, monkeypatch, tmp_path):
         def close(self):
             return None
 
-    (tmp_path / "block_game.txt").write_text("||example.com^\n", encoding="utf-8")
-    monkeypatch.chdir(tmp_path)
+    (tmp_out / "block_game.txt").write_text("||example.com^\n", encoding="utf-8")
+    monkeypatch.chdir(tmp_out)
     conn = ImportConn()
     monkeypatch.setattr(auto_git, "get_db_connection", lambda: conn)
     monkeypatch.setattr(auto_git, "flash", lambda *a, **k: None)
-    monkeypatch.setattr(
-        auth,
-        "decode_token",
-        lambda token: {"sub": "admin", "is_admin": "admin"},
-    )
-    with client.session_transaction() as sess:
-        sess["access_token"] = "token"
+    login(client, "admin")
 
     resp = client.get("/auto_import")
 
     assert resp.status_code == 302
 
-    assert any("INSERT INTO block_list" in sql for sql, _ in conn.cursor_obj.queries)
+    assert_sql(conn.cursor_obj.queries, "INSERT INTO block_list")
@@ -0,0 +1,37 @@
+"""Benchmarks for pure helpers on the request path.
+
+``--benchmark-skip`` in the default ``addopts`` skips them; ``--benchmark-only``
+overrides it, so time them with
+``python -m pytest tests/test_benchmarks.py -n0 --no-cov --benchmark-only``.
+"""
+
+from datetime import datetime
+
+import pytest
+
+from src.safe_family.todo.todo import generate_time_slots
+from src.safe_family.urls.analyzer import get_time_range
+
+pytest.importorskip("pytest_benchmark")
+
+MONDAY = datetime(2025, 1, 6, 12, 0)
+# Rounds x iterations keeps each benchmark under about a second.
+PEDANTIC = {"rounds": 20, "iterations": 500, "warmup_rounds": 3}
+
+
+def test_generate_time_slots_bench(benchmark):
+    slots = benchmark.pedantic(
+        generate_time_slots,
+        args=("30", "weekday", "", "", MONDAY),
+        **PEDANTIC,
+    )
+    assert len(slots) == 6
+
+
+def test_get_time_range_bench(benchmark):
+    start, end = benchmark.pedantic(
+        get_time_range,
+        kwargs={"time_range": "last_hour", "now": datetime(2025, 1, 2, 15, 30)},
+        **PEDANTIC,
+    )
+    assert start < end
@@ -2,9 +2,12 @@
 
 from types import SimpleNamespace
 
-from src.safe_family.core import auth
+import pytest
+
 from src.safe_family.urls import blocker
 
+from .conftest import login
+
 
 def test_rule_enable_ai_posts(monkeypatch, patch_requests):
     monkeypatch.setattr(blocker.settings, "ADGUARD_HOSTPORT", "localhost")
@@ -13,8 +16,8 @@ def test_rule_enable_ai_posts(monkeypatch, patch_requests):
 
     blocker.rule_enable_ai()
 
-    assert patch_requests
-    call = patch_requests[0]
+    assert patch_requests.count == 1
+    call = patch_requests.last
     assert "/control/filtering/set_url" in call.args[0]
     assert call.kwargs["json"]["data"]["name"] == "AI"
 
@@ -24,8 +27,8 @@ def test_update_blocked_services_puts(monkeypatch, patch_requests):
 
     blocker._update_blocked_services(["discord"])
 
-    assert patch_requests
-    call = patch_requests[0]
+    assert patch_requests.count == 1
+    call = patch_requests.last
     assert "/control/blocked_services/update" in call.args[0]
     assert call.kwargs["json"]["ids"] == ["discord"]
 
@@ -35,55 +38,32 @@ def test_rule_stop_traffic_all_hits_router(monkeypatch, patch_requests):
 
     blocker.rule_stop_traffic_all()
 
-    assert patch_requests
-    call = patch_requests[0]
+    assert patch_requests.count == 1
+    call = patch_requests.last
     assert "/cgi-bin/disablegateway.sh" in call.args[0]
 
 
-def test_rules_disable_ai_cooldown(client, monkeypatch):
-    monkeypatch.setattr(auth, "decode_token", lambda token: {"sub": "user"})
-    with client.session_transaction() as sess:
-        sess["access_token"] = "token"
-    blocker.DISABLE_AI_STATE["last_run"] = 100.0
-    monkeypatch.setattr(blocker.time_module, "monotonic", lambda: 105.0)
-    monkeypatch.setattr(blocker, "flash", lambda *a, **k: None)
-
-    resp = client.post("/rules_toggle/disable_ai")
-
-    assert resp.status_code == 302
-
-
-def test_rules_disable_ai_success(client, monkeypatch):
-    monkeypatch.setattr(auth, "decode_token", lambda token: {"sub": "user"})
-    with client.session_transaction() as sess:
-        sess["access_token"] = "token"
-    blocker.DISABLE_AI_STATE["last_run"] = 0.0
-    monkeypatch.setattr(blocker.time_module, "monotonic", lambda: 100.0)
-    monkeypatch.setattr(blocker, "flash", lambda *a, **k: None)
+@pytest.mark.parametrize(
+    ("last_run", "now", "expected_category"),
+    [(100.0, 105.0, "warning"), (0.0, 1000.0, "success")],
+    ids=["cooldown", "success"],
+)
+def test_rules_disable_ai(client, monkeypatch, last_run, now, expected_category):
+    login(client)
+    monkeypatch.setitem(blocker.DISABLE_AI_STATE, "last_run", last_run)
+    monkeypatch.setattr(blocker.time_module, "monotonic", lambda: now)
+    flashed = []
+    monkeypatch.setattr(blocker, "flash", lambda message, category: flashed.append(category))
     monkeypatch.setattr(blocker, "rule_disable_ai", lambda: SimpleNamespace(status_code=200))
 
     resp = client.post("/rules_toggle/disable_ai")
 
     assert resp.status_code == 302
+    assert flashed == [expected_category]
 
 
-def test_rule_enable_all_except_ai_calls_updates(monkeypatch):
-    calls = {"rules": None, "blocked": None}
-    monkeypatch.setattr(blocker, "_run_rule_updates", lambda rules: calls.__setitem__("rules", rules))
-    monkeypatch.setattr(
-        blocker,
-        "_update_blocked_services",
-        lambda ids: calls.__setitem__("blocked", ids) or SimpleNamespace(status_code=200, text="ok"),
-    )
-
-    resp = blocker.rule_enable_all_except_ai()
-
-    assert resp.status_code == 200
-    assert calls["rules"] is not None
-    assert calls["blocked"] is not None
-
-
-def test_rule_disable_all_calls_updates(monkeypatch):
+@pytest.mark.parametrize("fn_name", ["rule_enable_all_except_ai", "rule_disable_all"])
+def test_rule_bulk_toggle_calls_updates(monkeypatch, fn_name):
     calls = {"rules": None, "blocked": None}
     monkeypatch.setattr(blocker, "_run_rule_updates", lambda rules: calls.__setitem__("rules", rules))
     monkeypatch.setattr(
@@ -92,7 +72,7 @@ def test_rule_disable_all_calls_updates(monkeypatch):
         lambda ids: calls.__setitem__("blocked", ids) or SimpleNamespace(status_code=200, text="ok"),
     )
 
-    resp = blocker.rule_disable_all()
+    resp = getattr(blocker, fn_name)()
 
     assert resp.status_code == 200
     assert calls["rules"] is not None
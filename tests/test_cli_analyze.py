@@ -3,7 +3,7 @@
 from src.safe_family.cli import analyze
 
 
-def test_cli_analyze_calls_log_analysis(monkeypatch):
+def test_cli_analyze_calls_log_analysis(monkeypatch, cli_runner):
     called = {}
 
     def fake_get_time_range(**kwargs):
@@ -16,7 +16,7 @@ def test_cli_analyze_calls_log_analysis(monkeypatch):
     monkeypatch.setattr(analyze, "get_time_range", fake_get_time_range)
     monkeypatch.setattr(analyze, "log_analysis", fake_log_analysis)
 
-    analyze.main(["--range", "last_5min"])
+    cli_runner.invoke("analyze", ["--range", "last_5min"])
 
     assert called["range"] == "last_5min"
     assert called["log_analysis"] == ("start", "end")
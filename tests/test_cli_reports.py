@@ -1,5 +1,6 @@
 """Tests for weekly metrics CLI."""
 
+from datetime import date
 from pathlib import Path
 
 import pandas as pd
@@ -7,23 +8,32 @@ import pytest
 
 from src.safe_family.cli import weekly_metrics
 
+WEEK_START = date(2025, 1, 1)
+WEEK_END = date(2025, 1, 7)
+# _compute_metrics copies its input, so one empty frame can back every stub.
+EMPTY_WEEK = pd.DataFrame()
 
+
+@pytest.mark.unit
 def test_parse_iso_week_invalid():
     with pytest.raises(ValueError, match="YYYY-Www format"):
         weekly_metrics._parse_iso_week("2025-13")
 
 
+@pytest.mark.unit
 def test_parse_time_slot_minutes_cross_midnight():
     minutes = weekly_metrics._parse_time_slot_minutes("23:00 - 01:00")
     assert minutes == 120.0
 
 
+@pytest.mark.unit
 def test_status_weight_maps_values():
     series = pd.Series(["done", "half done", "skipped", None])
     weights = weekly_metrics._status_weight(series)
     assert weights.tolist() == [1.0, 0.5, 0.0, 0.0]
 
 
+@pytest.mark.unit
 def test_compute_metrics_returns_summary():
     df = pd.DataFrame(
         [
@@ -39,9 +49,7 @@ def test_compute_metrics_returns_summary():
             },
         ],
     )
-    start = pd.Timestamp("2025-01-01").date()
-    end = pd.Timestamp("2025-01-07").date()
-    metrics = weekly_metrics._compute_metrics(df, start, end)
+    metrics = weekly_metrics._compute_metrics(df, WEEK_START, WEEK_END)
 
     assert metrics.completion_rate is not None
     assert "math" in metrics.by_category
@@ -74,18 +82,15 @@ def test_fetch_week_df_returns_dataframe(monkeypatch):
             return None
 
     monkeypatch.setattr(weekly_metrics, "get_db_connection", FakeConn)
-    df = weekly_metrics._fetch_week_df(
-        pd.Timestamp("2025-01-01").date(),
-        pd.Timestamp("2025-01-07").date(),
-        "alice",
-    )
+    df = weekly_metrics._fetch_week_df(WEEK_START, WEEK_END, "alice")
     assert not df.empty
 
 
-def test_weekly_metrics_main_rejects_conflicting_outputs(monkeypatch):
-    monkeypatch.setattr(weekly_metrics, "_fetch_week_df", lambda *a, **k: pd.DataFrame())
+def test_weekly_metrics_main_rejects_conflicting_outputs(monkeypatch, cli_runner):
+    monkeypatch.setattr(weekly_metrics, "_fetch_week_df", lambda *a, **k: EMPTY_WEEK)
     with pytest.raises(ValueError, match="only one of"):
-        weekly_metrics.main(
+        cli_runner.invoke(
+            "weekly_metrics",
             [
                 "--username",
                 "alice",
@@ -97,15 +102,16 @@ def test_weekly_metrics_main_rejects_conflicting_outputs(monkeypatch):
         )
 
 
-def test_weekly_metrics_main_writes_output_dir(monkeypatch, tmp_path, capsys):
-    monkeypatch.setattr(weekly_metrics, "_fetch_week_df", lambda *a, **k: pd.DataFrame())
+def test_weekly_metrics_main_writes_output_dir(monkeypatch, cli_runner, tmp_out, capsys):
+    monkeypatch.setattr(weekly_metrics, "_fetch_week_df", lambda *a, **k: EMPTY_WEEK)
 
-    code = weekly_metrics.main(
+    code = cli_runner.invoke(
+        "weekly_metrics",
         [
             "--username",
             "alice",
             "--output-dir",
-            str(tmp_path),
+            str(tmp_out),
         ],
     )
     captured = capsys.readouterr()
@@ -115,11 +121,12 @@ def test_weekly_metrics_main_writes_output_dir(monkeypatch, tmp_path, capsys):
     assert output_path.exists()
 
 
-def test_weekly_metrics_main_writes_output_file(monkeypatch, tmp_path, capsys):
-    monkeypatch.setattr(weekly_metrics, "_fetch_week_df", lambda *a, **k: pd.DataFrame())
-    output_file = tmp_path / "week.json"
+def test_weekly_metrics_main_writes_output_file(monkeypatch, cli_runner, tmp_out, capsys):
+    monkeypatch.setattr(weekly_metrics, "_fetch_week_df", lambda *a, **k: EMPTY_WEEK)
+    output_file = tmp_out / "week.json"
 
-    code = weekly_metrics.main(
+    code = cli_runner.invoke(
+        "weekly_metrics",
         [
             "--username",
             "alice",
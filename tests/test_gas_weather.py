@@ -19,8 +19,8 @@ def test_prepare_weather_message(monkeypatch):
 def test_send_telegram_message_posts(monkeypatch, patch_requests):
     _configure_telegram(monkeypatch)
     gas_weather.send_telegram_message("hello")
-    assert patch_requests
-    call = patch_requests[0]
+    assert patch_requests.count == 1
+    call = patch_requests.last
     assert call.args[0] == "https://api.telegram.org/botbot-token/sendMessage"
     assert call.kwargs["data"] == {"chat_id": "chat-1", "text": "hello"}
 
@@ -42,8 +42,8 @@ def test_send_telegram_photo_posts(monkeypatch, patch_requests, tmp_path):
 
     gas_weather.send_telegram_photo(photo, caption="today")
 
-    assert patch_requests
-    call = patch_requests[0]
+    assert patch_requests.count == 1
+    call = patch_requests.last
     assert call.args[0] == "https://api.telegram.org/botbot-token/sendPhoto"
     assert call.kwargs["data"] == {"chat_id": "chat-1", "caption": "today"}
     assert "photo" in call.kwargs["files"]
@@ -86,7 +86,7 @@ def test_report_skips_when_not_configured(monkeypatch, patch_requests):
     monkeypatch.setattr(gas_weather.settings, "TELEGRAM_BOT", "")
     monkeypatch.setattr(gas_weather.settings, "TELEGRAM_CHAT_ID", "")
     gas_weather.send_gas_weather_report()
-    assert patch_requests == []
+    assert patch_requests.count == 0
 
 
 def test_report_sends_weather_and_photo(monkeypatch, patch_requests, tmp_path):
@@ -97,10 +97,10 @@ def test_report_sends_weather_and_photo(monkeypatch, patch_requests, tmp_path):
 
     gas_weather.send_gas_weather_report()
 
-    assert len(patch_requests) == 2
-    assert patch_requests[0].args[0].endswith("/sendMessage")
-    assert patch_requests[1].args[0].endswith("/sendPhoto")
-    assert gas_weather.GAS_URL in patch_requests[1].kwargs["data"]["caption"]
+    assert patch_requests.count == 2
+    assert patch_requests.first.args[0].endswith("/sendMessage")
+    assert patch_requests.last.args[0].endswith("/sendPhoto")
+    assert gas_weather.GAS_URL in patch_requests.last.kwargs["data"]["caption"]
 
 
 def test_report_falls_back_when_snapshot_fails(monkeypatch, patch_requests):
@@ -113,5 +113,5 @@ def test_report_falls_back_when_snapshot_fails(monkeypatch, patch_requests):
 
     gas_weather.send_gas_weather_report()
 
-    assert len(patch_requests) == 2
-    assert patch_requests[1].kwargs["data"]["text"] == "gas price not available"
+    assert patch_requests.count == 2
+    assert patch_requests.last.kwargs["data"]["text"] == "gas price not available"
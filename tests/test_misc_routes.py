@@ -1,49 +1,54 @@
 """Tests for miscellaneous routes like notes view/media."""
 
 import io
-from datetime import datetime
 
-from flask_jwt_extended import create_access_token
+import pytest
 
+from src.safe_family.core import auth
 from src.safe_family.core.extensions import db
-from src.safe_family.core.models import Media, Note, Tag, User
+from src.safe_family.core.models import Media, Note, Tag
 from src.safe_family.urls import notes
 
+from .conftest import FIXED_NOW, login, make_note, make_user, stub_render
 
-def _login_session(app, client, user_id):
-    with app.app_context():
-        token = create_access_token(identity=user_id)
-    with client.session_transaction() as sess:
-        sess["access_token"] = token
+_TOKEN_PREFIX = "test-token-"
 
 
-def test_notes_view_requires_login(notesync_app, notesync_client, monkeypatch):
-    monkeypatch.setattr(notes, "render_template", lambda *a, **k: ("ok", 200))
+@pytest.fixture(scope="module", autouse=True)
+def _stub_notes_views():
+    """Stub out templates once for every test in this module."""
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(notes, "render_template", stub_render)
+        yield
 
+
+@pytest.fixture(autouse=True)
+def _stub_decode_token(monkeypatch):
+    """Accept fake session tokens instead of signing real JWTs."""
+    monkeypatch.setattr(
+        auth,
+        "decode_token",
+        lambda token: {"sub": token.removeprefix(_TOKEN_PREFIX)},
+    )
+
+
+def _login_session(client, user_id):
+    login(client, f"{_TOKEN_PREFIX}{user_id}")
+
+
+def test_notes_view_requires_login(notesync_app, notesync_client):
     resp = notesync_client.get("/notes")
 
     assert resp.status_code == 302
     assert resp.location.endswith("/auth/login-ui")
 
 
-def test_notes_view_renders(notesync_app, notesync_client, monkeypatch):
-    with notesync_app.app_context():
-        user = User(id="u-notes", username="alice", email="a@example.com")
-        user.set_password("secret")
-        note = Note(
-            id="n1",
-            user_id="u-notes",
-            text="hello",
-            is_pinned=False,
-            created_at=datetime.utcnow(),
-            updated_at=datetime.utcnow(),
-            deleted_at=None,
-        )
-        db.session.add_all([user, note])
-        db.session.commit()
+def test_notes_view_renders(notesync_app, notesync_client):
+    note = make_note("n1", "u-notes", "hello", FIXED_NOW)
+    db.session.add(note)
+    db.session.flush()
 
-    _login_session(notesync_app, notesync_client, "u-notes")
-    monkeypatch.setattr(notes, "render_template", lambda *a, **k: ("ok", 200))
+    _login_session(notesync_client, "u-notes")
 
     resp = notesync_client.get("/notes")
 
@@ -51,13 +56,7 @@ def test_notes_view_renders(notesync_app, notesync_client, monkeypatch):
 
 
 def test_notes_media_404(notesync_app, notesync_client):
-    with notesync_app.app_context():
-        user = User(id="u-media", username="alice", email="a@example.com")
-        user.set_password("secret")
-        db.session.add(user)
-        db.session.commit()
-
-    _login_session(notesync_app, notesync_client, "u-media")
+    _login_session(notesync_client, "u-media")
 
     resp = notesync_client.get("/notes/media/missing")
 
@@ -65,33 +64,22 @@ def test_notes_media_404(notesync_app, notesync_client):
 
 
 def test_notes_media_success(notesync_app, notesync_client):
-    with notesync_app.app_context():
-        user = User(id="u-media2", username="alice", email="a@example.com")
-        user.set_password("secret")
-        note = Note(
-            id="n2",
-            user_id="u-media2",
-            text="hello",
-            is_pinned=False,
-            created_at=datetime.utcnow(),
-            updated_at=datetime.utcnow(),
-            deleted_at=None,
-        )
-        media = Media(
-            id="m1",
-            note_id="n2",
-            user_id="u-media2",
-            kind="image",
-            filename="photo.jpg",
-            content_type="image/jpeg",
-            checksum="sha256:abc",
-            data=b"hello",
-            created_at=datetime.utcnow(),
-        )
-        db.session.add_all([user, note, media])
-        db.session.commit()
+    note = make_note("n2", "u-media2", "hello", FIXED_NOW)
+    media = Media(
+        id="m1",
+        note_id="n2",
+        user_id="u-media2",
+        kind="image",
+        filename="photo.jpg",
+        content_type="image/jpeg",
+        checksum="sha256:abc",
+        data=b"hello",
+        created_at=FIXED_NOW,
+    )
+    db.session.add_all([note, media])
+    db.session.flush()
 
-    _login_session(notesync_app, notesync_client, "u-media2")
+    _login_session(notesync_client, "u-media2")
 
     resp = notesync_client.get("/notes/media/m1")
 
@@ -101,19 +89,7 @@ def test_notes_media_success(notesync_app, notesync_client):
 
 def test_notes_media_public_note_for_other_user(notesync_app, notesync_client):
     with notesync_app.app_context():
-        owner = User(id="u-owner", username="owner", email="owner@example.com")
-        owner.set_password("secret")
-        viewer = User(id="u-viewer", username="viewer", email="viewer@example.com")
-        viewer.set_password("secret")
-        note = Note(
-            id="n-public",
-            user_id="u-owner",
-            text="public note",
-            is_pinned=False,
-            created_at=datetime.utcnow(),
-            updated_at=datetime.utcnow(),
-            deleted_at=None,
-        )
+        note = make_note("n-public", "u-owner", "public note", FIXED_NOW)
         tag = Tag(id="t-public", user_id="u-owner", name="public")
         note.tags.append(tag)
         media = Media(
@@ -125,12 +101,12 @@ def test_notes_media_public_note_for_other_user(notesync_app, notesync_client):
             content_type="image/jpeg",
             checksum="sha256:def",
             data=b"public",
-            created_at=datetime.utcnow(),
+            created_at=FIXED_NOW,
         )
-        db.session.add_all([owner, viewer, note, tag, media])
+        db.session.add_all([note, tag, media])
         db.session.commit()
 
-    _login_session(notesync_app, notesync_client, "u-viewer")
+    _login_session(notesync_client, "u-viewer")
 
     resp = notesync_client.get("/notes/media/m-public")
 
@@ -140,12 +116,11 @@ def test_notes_media_public_note_for_other_user(notesync_app, notesync_client):
 
 def test_upload_note_with_text_and_tags(notesync_app, notesync_client):
     with notesync_app.app_context():
-        user = User(id="u-up1", username="alice", email="a@example.com")
-        user.set_password("secret")
+        user = make_user("u-up1", "alice", "a@example.com")
         db.session.add(user)
         db.session.commit()
 
-    _login_session(notesync_app, notesync_client, "u-up1")
+    _login_session(notesync_client, "u-up1")
 
     resp = notesync_client.post(
         "/notes/upload",
@@ -163,12 +138,11 @@ def test_upload_note_with_text_and_tags(notesync_app, notesync_client):
 
 def test_upload_note_with_media_file(notesync_app, notesync_client):
     with notesync_app.app_context():
-        user = User(id="u-up2", username="bob", email="b@example.com")
-        user.set_password("secret")
+        user = make_user("u-up2", "bob", "b@example.com")
         db.session.add(user)
         db.session.commit()
 
-    _login_session(notesync_app, notesync_client, "u-up2")
+    _login_session(notesync_client, "u-up2")
 
     resp = notesync_client.post(
         "/notes/upload",
@@ -192,12 +166,11 @@ def test_upload_note_with_media_file(notesync_app, notesync_client):
 
 def test_upload_note_audio_kind(notesync_app, notesync_client):
     with notesync_app.app_context():
-        user = User(id="u-up4", username="dave", email="d@example.com")
-        user.set_password("secret")
+        user = make_user("u-up4", "dave", "d@example.com")
         db.session.add(user)
         db.session.commit()
 
-    _login_session(notesync_app, notesync_client, "u-up4")
+    _login_session(notesync_client, "u-up4")
 
     resp = notesync_client.post(
         "/notes/upload",
@@ -213,17 +186,8 @@ def test_upload_note_audio_kind(notesync_app, notesync_client):
 
 def test_delete_note_removes_note_and_media(notesync_app, notesync_client):
     with notesync_app.app_context():
-        user = User(id="u-del", username="erin", email="e@example.com")
-        user.set_password("secret")
-        note = Note(
-            id="n-del",
-            user_id="u-del",
-            text="to delete",
-            is_pinned=False,
-            created_at=datetime.utcnow(),
-            updated_at=datetime.utcnow(),
-            deleted_at=None,
-        )
+        user = make_user("u-del", "erin", "e@example.com")
+        note = make_note("n-del", "u-del", "to delete", FIXED_NOW)
         media = Media(
             id="m-del",
             note_id="n-del",
@@ -233,12 +197,12 @@ def test_delete_note_removes_note_and_media(notesync_app, notesync_client):
             content_type="image/jpeg",
             checksum="sha256:xyz",
             data=b"bytes",
-            created_at=datetime.utcnow(),
+            created_at=FIXED_NOW,
         )
         db.session.add_all([user, note, media])
         db.session.commit()
 
-    _login_session(notesync_app, notesync_client, "u-del")
+    _login_session(notesync_client, "u-del")
 
     resp = notesync_client.post("/notes/delete/n-del")
 
@@ -250,23 +214,13 @@ def test_delete_note_removes_note_and_media(notesync_app, notesync_client):
 
 def test_delete_note_404_for_other_users_note(notesync_app, notesync_client):
     with notesync_app.app_context():
-        owner = User(id="u-del-o", username="frank", email="f@example.com")
-        owner.set_password("secret")
-        intruder = User(id="u-del-i", username="grace", email="g@example.com")
-        intruder.set_password("secret")
-        note = Note(
-            id="n-del-2",
-            user_id="u-del-o",
-            text="not yours",
-            is_pinned=False,
-            created_at=datetime.utcnow(),
-            updated_at=datetime.utcnow(),
-            deleted_at=None,
-        )
+        owner = make_user("u-del-o", "frank", "f@example.com")
+        intruder = make_user("u-del-i", "grace", "g@example.com")
+        note = make_note("n-del-2", "u-del-o", "not yours", FIXED_NOW)
         db.session.add_all([owner, intruder, note])
         db.session.commit()
 
-    _login_session(notesync_app, notesync_client, "u-del-i")
+    _login_session(notesync_client, "u-del-i")
 
     resp = notesync_client.post("/notes/delete/n-del-2")
 
@@ -277,12 +231,11 @@ def test_delete_note_404_for_other_users_note(notesync_app, notesync_client):
 
 def test_upload_note_rejects_empty_submission(notesync_app, notesync_client):
     with notesync_app.app_context():
-        user = User(id="u-up3", username="carol", email="c@example.com")
-        user.set_password("secret")
+        user = make_user("u-up3", "carol", "c@example.com")
         db.session.add(user)
         db.session.commit()
 
-    _login_session(notesync_app, notesync_client, "u-up3")
+    _login_session(notesync_client, "u-up3")
 
     resp = notesync_client.post("/notes/upload", data={"text": "   "})
 
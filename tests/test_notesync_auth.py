@@ -1,15 +1,8 @@
 """Tests for notesync auth enforcement."""
 
-from flask_jwt_extended import create_access_token
-
 from src.safe_family.core.extensions import db
-from src.safe_family.core.models import User
-
 
-def _auth_headers(app, user_id, api_key="test-api-key"):
-    with app.app_context():
-        token = create_access_token(identity=user_id)
-    return {"Authorization": f"Bearer {token}", "X-API-Key": api_key}
+from .conftest import auth_headers, make_user
 
 
 def test_notesync_requires_api_key(notesync_client):
@@ -33,11 +26,10 @@ def test_notesync_accepts_auth(notesync_app, notesync_client, monkeypatch):
         lambda ops, user_id: [],
     )
     with notesync_app.app_context():
-        user = User(id="user-1", username="user", email="user@example.com")
-        user.set_password("secret")
+        user = make_user("user-1", "user", "user@example.com")
         db.session.add(user)
         db.session.commit()
-    headers = _auth_headers(notesync_app, "user-1")
+    headers = auth_headers(notesync_app, "user-1")
     resp = notesync_client.post("/api/notesync", json={"ops": []}, headers=headers)
     assert resp.status_code == 200
     assert resp.get_json() == {"results": []}
@@ -1,49 +1,43 @@
 """Tests for notesync last-write-wins behavior."""
 
-from datetime import datetime, timedelta
+from datetime import timedelta
 
 from src.safe_family.core.extensions import db
 from src.safe_family.core.models import Note
 from src.safe_family.notesync.schemas import SyncRequest
 from src.safe_family.notesync.service import apply_sync_ops
 
+from .conftest import FIXED_NOW, make_note
+
 
 def test_lww_skips_older_update(notesync_app):
     user_id = "user-1"
-    now = datetime.utcnow()
+    now = FIXED_NOW
     older = now - timedelta(minutes=5)
+    payload = {
+        "ops": [
+            {
+                "opId": "op1",
+                "opType": "update",
+                "note": {
+                    "id": "n1",
+                    "text": "older",
+                    "isPinned": False,
+                    "tags": [],
+                    "createdAt": now,
+                    "updatedAt": older,
+                    "deletedAt": None,
+                },
+                "media": [],
+            },
+        ],
+    }
+    req = SyncRequest.model_validate(payload)
     with notesync_app.app_context():
-        note = Note(
-            id="n1",
-            user_id=user_id,
-            text="newer",
-            is_pinned=False,
-            created_at=now,
-            updated_at=now,
-            deleted_at=None,
-        )
+        note = make_note("n1", user_id, "newer", now)
         db.session.add(note)
         db.session.commit()
 
-        payload = {
-            "ops": [
-                {
-                    "opId": "op1",
-                    "opType": "update",
-                    "note": {
-                        "id": "n1",
-                        "text": "older",
-                        "isPinned": False,
-                        "tags": [],
-                        "createdAt": now,
-                        "updatedAt": older,
-                        "deletedAt": None,
-                    },
-                    "media": [],
-                },
-            ],
-        }
-        req = SyncRequest.model_validate(payload)
         results = apply_sync_ops(req.ops, user_id=user_id)
 
         db.session.refresh(note)
@@ -54,40 +48,32 @@ def test_lww_skips_older_update(notesync_app):
 
 def test_delete_tombstone_applies(notesync_app):
     user_id = "user-2"
-    now = datetime.utcnow()
+    now = FIXED_NOW
     newer = now + timedelta(minutes=5)
+    payload = {
+        "ops": [
+            {
+                "opId": "op2",
+                "opType": "delete",
+                "note": {
+                    "id": "n2",
+                    "text": "hello",
+                    "isPinned": False,
+                    "tags": [],
+                    "createdAt": now,
+                    "updatedAt": newer,
+                    "deletedAt": None,
+                },
+                "media": [],
+            },
+        ],
+    }
+    req = SyncRequest.model_validate(payload)
     with notesync_app.app_context():
-        note = Note(
-            id="n2",
-            user_id=user_id,
-            text="hello",
-            is_pinned=False,
-            created_at=now,
-            updated_at=now,
-            deleted_at=None,
-        )
+        note = make_note("n2", user_id, "hello", now)
         db.session.add(note)
         db.session.commit()
 
-        payload = {
-            "ops": [
-                {
-                    "opId": "op2",
-                    "opType": "delete",
-                    "note": {
-                        "id": "n2",
-                        "text": "hello",
-                        "isPinned": False,
-                        "tags": [],
-                        "createdAt": now,
-                        "updatedAt": newer,
-                        "deletedAt": None,
-                    },
-                    "media": [],
-                },
-            ],
-        }
-        req = SyncRequest.model_validate(payload)
         results = apply_sync_ops(req.ops, user_id=user_id)
         db.session.refresh(note)
 
@@ -97,27 +83,27 @@ def test_delete_tombstone_applies(notesync_app):
 
 def test_idempotent_ops_skip(notesync_app):
     user_id = "user-3"
-    now = datetime.utcnow()
-    with notesync_app.app_context():
-        payload = {
-            "ops": [
-                {
-                    "opId": "op3",
-                    "opType": "create",
-                    "note": {
-                        "id": "n3",
-                        "text": "hello",
-                        "isPinned": False,
-                        "tags": ["work"],
-                        "createdAt": now,
-                        "updatedAt": now,
-                        "deletedAt": None,
-                    },
-                    "media": [],
+    now = FIXED_NOW
+    payload = {
+        "ops": [
+            {
+                "opId": "op3",
+                "opType": "create",
+                "note": {
+                    "id": "n3",
+                    "text": "hello",
+                    "isPinned": False,
+                    "tags": ["work"],
+                    "createdAt": now,
+                    "updatedAt": now,
+                    "deletedAt": None,
                 },
-            ],
-        }
-        req = SyncRequest.model_validate(payload)
+                "media": [],
+            },
+        ],
+    }
+    req = SyncRequest.model_validate(payload)
+    with notesync_app.app_context():
         results = apply_sync_ops(req.ops, user_id=user_id)
         assert results[0][1] == "applied"
 
@@ -128,41 +114,33 @@ def test_idempotent_ops_skip(notesync_app):
 
 def test_delete_uses_deleted_at_recency(notesync_app):
     user_id = "user-4"
-    now = datetime.utcnow()
+    now = FIXED_NOW
     older = now - timedelta(minutes=10)
     newer_deleted = now + timedelta(minutes=10)
+    payload = {
+        "ops": [
+            {
+                "opId": "op4",
+                "opType": "delete",
+                "note": {
+                    "id": "n4",
+                    "text": "hello",
+                    "isPinned": False,
+                    "tags": [],
+                    "createdAt": now,
+                    "updatedAt": older,
+                    "deletedAt": newer_deleted,
+                },
+                "media": [],
+            },
+        ],
+    }
+    req = SyncRequest.model_validate(payload)
     with notesync_app.app_context():
-        note = Note(
-            id="n4",
-            user_id=user_id,
-            text="hello",
-            is_pinned=False,
-            created_at=now,
-            updated_at=now,
-            deleted_at=None,
-        )
+        note = make_note("n4", user_id, "hello", now)
         db.session.add(note)
         db.session.commit()
 
-        payload = {
-            "ops": [
-                {
-                    "opId": "op4",
-                    "opType": "delete",
-                    "note": {
-                        "id": "n4",
-                        "text": "hello",
-                        "isPinned": False,
-                        "tags": [],
-                        "createdAt": now,
-                        "updatedAt": older,
-                        "deletedAt": newer_deleted,
-                    },
-                    "media": [],
-                },
-            ],
-        }
-        req = SyncRequest.model_validate(payload)
         results = apply_sync_ops(req.ops, user_id=user_id)
         db.session.refresh(note)
 
@@ -172,41 +150,40 @@ def test_delete_uses_deleted_at_recency(notesync_app):
 
 def test_delete_skips_when_existing_newer(notesync_app):
     user_id = "user-5"
-    now = datetime.utcnow()
+    now = FIXED_NOW
     existing_deleted = now + timedelta(minutes=5)
     older = now - timedelta(minutes=5)
+    payload = {
+        "ops": [
+            {
+                "opId": "op5",
+                "opType": "delete",
+                "note": {
+                    "id": "n5",
+                    "text": "hello",
+                    "isPinned": False,
+                    "tags": [],
+                    "createdAt": now,
+                    "updatedAt": older,
+                    "deletedAt": older,
+                },
+                "media": [],
+            },
+        ],
+    }
+    req = SyncRequest.model_validate(payload)
     with notesync_app.app_context():
-        note = Note(
-            id="n5",
-            user_id=user_id,
-            text="hello",
-            is_pinned=False,
-            created_at=now,
+        note = make_note(
+            "n5",
+            user_id,
+            "hello",
+            now,
             updated_at=existing_deleted,
             deleted_at=existing_deleted,
         )
         db.session.add(note)
         db.session.commit()
 
-        payload = {
-            "ops": [
-                {
-                    "opId": "op5",
-                    "opType": "delete",
-                    "note": {
-                        "id": "n5",
-                        "text": "hello",
-                        "isPinned": False,
-                        "tags": [],
-                        "createdAt": now,
-                        "updatedAt": older,
-                        "deletedAt": older,
-                    },
-                    "media": [],
-                },
-            ],
-        }
-        req = SyncRequest.model_validate(payload)
         results = apply_sync_ops(req.ops, user_id=user_id)
         db.session.refresh(note)
 
@@ -216,27 +193,27 @@ def test_delete_skips_when_existing_newer(notesync_app):
 
 def test_delete_creates_tombstone_for_missing_note(notesync_app):
     user_id = "user-6"
-    now = datetime.utcnow()
-    with notesync_app.app_context():
-        payload = {
-            "ops": [
-                {
-                    "opId": "op6",
-                    "opType": "delete",
-                    "note": {
-                        "id": "n6",
-                        "text": "hello",
-                        "isPinned": False,
-                        "tags": [],
-                        "createdAt": now,
-                        "updatedAt": now,
-                        "deletedAt": now,
-                    },
-                    "media": [],
+    now = FIXED_NOW
+    payload = {
+        "ops": [
+            {
+                "opId": "op6",
+                "opType": "delete",
+                "note": {
+                    "id": "n6",
+                    "text": "hello",
+                    "isPinned": False,
+                    "tags": [],
+                    "createdAt": now,
+                    "updatedAt": now,
+                    "deletedAt": now,
                 },
-            ],
-        }
-        req = SyncRequest.model_validate(payload)
+                "media": [],
+            },
+        ],
+    }
+    req = SyncRequest.model_validate(payload)
+    with notesync_app.app_context():
         results = apply_sync_ops(req.ops, user_id=user_id)
         note = Note.query.filter_by(id="n6", user_id=user_id).first()
 
@@ -1,159 +1,159 @@
 """Tests for notesync tag and media syncing."""
 
 import base64
-from datetime import datetime
+from datetime import timedelta
+
+import pytest
 
 from src.safe_family.core.models import Media, Note, Tag
 from src.safe_family.notesync.schemas import SyncRequest
 from src.safe_family.notesync.service import apply_sync_ops
 
+from .conftest import FIXED_NOW
 
-def test_notesync_creates_tags_and_media(notesync_app):
-    user_id = "user-tags"
-    now = datetime.utcnow()
-    raw_data = b"hello"
-    encoded = base64.b64encode(raw_data).decode("utf-8")
-    payload = {
-        "ops": [
-            {
-                "opId": "op-tags",
-                "opType": "create",
-                "note": {
-                    "id": "note-tags",
-                    "text": "note",
-                    "isPinned": False,
-                    "tags": ["Work", "home", "Work"],
-                    "createdAt": now,
-                    "updatedAt": now,
-                    "deletedAt": None,
-                },
-                "media": [
-                    {
-                        "id": "media-1",
-                        "noteId": "note-tags",
-                        "kind": "image",
-                        "filename": "photo.jpg",
-                        "contentType": "image/jpeg",
-                        "checksum": "sha256:abc",
-                        "dataBase64": encoded,
-                    },
-                ],
-            },
-        ],
-    }
-    req = SyncRequest.model_validate(payload)
-    with notesync_app.app_context():
-        results = apply_sync_ops(req.ops, user_id=user_id)
-        assert results[0][1] == "applied"
-
-        note = Note.query.filter_by(id="note-tags", user_id=user_id).first()
-        assert note is not None
-
-        tags = Tag.query.filter_by(user_id=user_id).all()
-        tag_names = sorted(tag.name for tag in tags)
-        assert tag_names == ["Work", "home"]
-        assert sorted(tag.name for tag in note.tags) == ["Work", "home"]
+_HELLO_B64 = base64.b64encode(b"hello").decode()
+_FIRST_B64 = base64.b64encode(b"first").decode()
+_SECOND_B64 = base64.b64encode(b"second").decode()
+_DUP_B64 = base64.b64encode(b"dup").decode()
 
-        media = Media.query.filter_by(id="media-1", user_id=user_id).first()
-        assert media is not None
-        assert media.data == raw_data
-        assert media.note_id == "note-tags"
 
-
-def test_notesync_media_updates(notesync_app):
-    user_id = "user-media"
-    now = datetime.utcnow()
-    raw_data = b"first"
-    encoded = base64.b64encode(raw_data).decode("utf-8")
-    payload = {
+def _payload(op_id, note_id, media, tags=()):
+    return {
         "ops": [
             {
-                "opId": "op-media",
+                "opId": op_id,
                 "opType": "create",
                 "note": {
-                    "id": "note-media",
+                    "id": note_id,
                     "text": "note",
                     "isPinned": False,
-                    "tags": [],
-                    "createdAt": now,
-                    "updatedAt": now,
+                    "tags": list(tags),
+                    "createdAt": FIXED_NOW,
+                    "updatedAt": FIXED_NOW,
                     "deletedAt": None,
                 },
-                "media": [
-                    {
-                        "id": "media-2",
-                        "noteId": "note-media",
-                        "kind": "audio",
-                        "filename": "clip.m4a",
-                        "contentType": "audio/mp4",
-                        "checksum": "sha256:one",
-                        "dataBase64": encoded,
-                    },
-                ],
+                "media": [media],
             },
         ],
     }
-    req = SyncRequest.model_validate(payload)
-    with notesync_app.app_context():
-        apply_sync_ops(req.ops, user_id=user_id)
-
-        updated_data = b"second"
-        payload["ops"][0]["opId"] = "op-media-2"
-        payload["ops"][0]["note"]["updatedAt"] = datetime.utcnow()
-        payload["ops"][0]["media"][0]["checksum"] = "sha256:two"
-        payload["ops"][0]["media"][0]["dataBase64"] = base64.b64encode(updated_data).decode("utf-8")
-
-        req = SyncRequest.model_validate(payload)
-        apply_sync_ops(req.ops, user_id=user_id)
 
-        media = Media.query.filter_by(id="media-2", user_id=user_id).first()
-        assert media is not None
-        assert media.data == updated_data
 
-
-def test_notesync_skips_duplicate_checksum(notesync_app):
-    user_id = "user-dup"
-    now = datetime.utcnow()
-    raw_data = b"dup"
-    encoded = base64.b64encode(raw_data).decode("utf-8")
-    payload = {
-        "ops": [
-            {
-                "opId": "op-dup-1",
-                "opType": "create",
-                "note": {
-                    "id": "note-dup",
-                    "text": "note",
-                    "isPinned": False,
-                    "tags": [],
-                    "createdAt": now,
-                    "updatedAt": now,
-                    "deletedAt": None,
-                },
-                "media": [
-                    {
-                        "id": "media-dup-1",
-                        "noteId": "note-dup",
-                        "kind": "image",
-                        "filename": "photo.jpg",
-                        "contentType": "image/jpeg",
-                        "checksum": "sha256:same",
-                        "dataBase64": encoded,
-                    },
-                ],
-            },
-        ],
-    }
+def _media(media_id, note_id, data_b64, **fields):
+    return {"id": media_id, "noteId": note_id, "dataBase64": data_b64, **fields}
+
+
+def _resync(req, op_id, media_changes):
+    """Copy a validated request as a newer op, patching its first media item."""
+    op = req.ops[0]
+    newer_ts = op.note.updatedAt + timedelta(seconds=1)
+    note = op.note.model_copy(update={"updatedAt": newer_ts})
+    media = [op.media[0].model_copy(update=media_changes)]
+    newer = op.model_copy(update={"opId": op_id, "note": note, "media": media})
+    return req.model_copy(update={"ops": [newer]})
+
+
+def _status(results, call):
+    """Return the first op's status from the ``call``-th ``apply_sync_ops``."""
+    return results[call][0][1]
+
+
+def _check_tags(user_id, results):
+    assert _status(results, 0) == "applied"
+
+    note = Note.query.filter_by(id="note-tags", user_id=user_id).first()
+    assert note is not None
+
+    tags = Tag.query.filter_by(user_id=user_id).all()
+    tag_names = sorted(tag.name for tag in tags)
+    assert tag_names == ["Work", "home"]
+    assert sorted(tag.name for tag in note.tags) == ["Work", "home"]
+
+    media = Media.query.filter_by(id="media-1", user_id=user_id).first()
+    assert media is not None
+    assert media.data == b"hello"
+    assert media.note_id == "note-tags"
+
+
+def _check_update(user_id, results):
+    assert [_status(results, call) for call in (0, 1)] == ["applied", "applied"]
+    media = Media.query.filter_by(id="media-2", user_id=user_id).first()
+    assert media is not None
+    assert media.data == b"second"
+
+
+def _check_duplicate(user_id, results):
+    assert [_status(results, call) for call in (0, 1)] == ["applied", "applied"]
+    assert len(Media.query.filter_by(user_id=user_id).all()) == 1
+
+
+_TAGS_PAYLOAD = _payload(
+    "op-tags",
+    "note-tags",
+    _media(
+        "media-1",
+        "note-tags",
+        _HELLO_B64,
+        kind="image",
+        filename="photo.jpg",
+        contentType="image/jpeg",
+        checksum="sha256:abc",
+    ),
+    tags=["Work", "home", "Work"],
+)
+_UPDATE_PAYLOAD = _payload(
+    "op-media",
+    "note-media",
+    _media(
+        "media-2",
+        "note-media",
+        _FIRST_B64,
+        kind="audio",
+        filename="clip.m4a",
+        contentType="audio/mp4",
+        checksum="sha256:one",
+    ),
+)
+_DUP_PAYLOAD = _payload(
+    "op-dup-1",
+    "note-dup",
+    _media(
+        "media-dup-1",
+        "note-dup",
+        _DUP_B64,
+        kind="image",
+        filename="photo.jpg",
+        contentType="image/jpeg",
+        checksum="sha256:same",
+    ),
+)
+
+CASES = [
+    ("tags", "user-tags", _TAGS_PAYLOAD, None, _check_tags),
+    (
+        "update",
+        "user-media",
+        _UPDATE_PAYLOAD,
+        ("op-media-2", {"checksum": "sha256:two", "dataBase64": _SECOND_B64}),
+        _check_update,
+    ),
+    (
+        "duplicate",
+        "user-dup",
+        _DUP_PAYLOAD,
+        ("op-dup-2", {"id": "media-dup-2"}),
+        _check_duplicate,
+    ),
+]
+
+
+@pytest.mark.parametrize(
+    ("user_id", "payload", "resync", "check"),
+    [case[1:] for case in CASES],
+    ids=[case[0] for case in CASES],
+)
+def test_notesync_scenarios(notesync_app, user_id, payload, resync, check):
     req = SyncRequest.model_validate(payload)
+    sync_requests = [req] if resync is None else [req, _resync(req, *resync)]
     with notesync_app.app_context():
-        apply_sync_ops(req.ops, user_id=user_id)
-
-        payload["ops"][0]["opId"] = "op-dup-2"
-        payload["ops"][0]["note"]["updatedAt"] = datetime.utcnow()
-        payload["ops"][0]["media"][0]["id"] = "media-dup-2"
-        req = SyncRequest.model_validate(payload)
-        apply_sync_ops(req.ops, user_id=user_id)
-
-        media = Media.query.filter_by(user_id=user_id).all()
-
-    assert len(media) == 1
+        results = [apply_sync_ops(r.ops, user_id=user_id) for r in sync_requests]
+        check(user_id, results)
@@ -2,6 +2,8 @@
 
 import contextlib
 
+import pytest
+
 from src.safe_family.notifications import notifier
 
 
@@ -32,8 +34,8 @@ def test_send_discord_notification_posts(monkeypatch, patch_requests):
         "bob",
         [{"time_slot": "09:00 - 10:00", "task": "Study"}],
     )
-    assert patch_requests
-    assert patch_requests[0].args[0] == "http://example.com"
+    assert patch_requests.count == 1
+    assert patch_requests.last_url == "http://example.com"
 
 
 def test_send_discord_notification_skips_when_disabled(monkeypatch, patch_requests):
@@ -42,28 +44,28 @@ def test_send_discord_notification_skips_when_disabled(monkeypatch, patch_reques
         "bob",
         [{"time_slot": "09:00 - 10:00", "task": "Study"}],
     )
-    assert patch_requests == []
+    assert patch_requests.count == 0
 
 
 def test_send_hammerspoon_alert_posts(monkeypatch, patch_requests):
     monkeypatch.setattr(notifier.settings, "HAMMERSPOON_ALERT_URL", "http://localhost:9181/alert")
     monkeypatch.setattr(notifier, "_is_hammerspoon_available", lambda url: True)
     notifier.send_hammerspoon_alert("hello")
-    assert patch_requests
-    assert patch_requests[0].args[0] == "http://localhost:9181/alert"
+    assert patch_requests.count == 1
+    assert patch_requests.last_url == "http://localhost:9181/alert"
 
 
 def test_send_hammerspoon_alert_skips_without_url(monkeypatch, patch_requests):
     monkeypatch.setattr(notifier.settings, "HAMMERSPOON_ALERT_URL", "")
     notifier.send_hammerspoon_alert("hello")
-    assert patch_requests == []
+    assert patch_requests.count == 0
 
 
 def test_send_hammerspoon_alert_skips_when_unavailable(monkeypatch, patch_requests):
     monkeypatch.setattr(notifier.settings, "HAMMERSPOON_ALERT_URL", "http://localhost:9181/alert")
     monkeypatch.setattr(notifier, "_is_hammerspoon_available", lambda url: False)
     notifier.send_hammerspoon_alert("hello")
-    assert patch_requests == []
+    assert patch_requests.count == 0
 
 
 def test_send_hammerspoon_alert_swallows_request_error(monkeypatch):
@@ -77,38 +79,27 @@ def test_send_hammerspoon_alert_swallows_request_error(monkeypatch):
     notifier.send_hammerspoon_alert("hello")
 
 
-def test_is_hammerspoon_available_missing_host():
-    assert notifier._is_hammerspoon_available("http://") is False
+def _raise_os_error(*a, **k):
+    raise OSError("fail")
 
 
-def test_is_hammerspoon_available_socket_error(monkeypatch):
-    monkeypatch.setattr(
-        notifier.socket,
-        "create_connection",
-        lambda *a, **k: (_ for _ in ()).throw(OSError("fail")),
-    )
-    assert notifier._is_hammerspoon_available("http://localhost:9181/alert") is False
+def _raise_request_error(*a, **k):
+    raise notifier.requests.RequestException("fail")
 
 
-def test_is_hammerspoon_available_options_error(monkeypatch):
-    monkeypatch.setattr(
-        notifier.socket,
-        "create_connection",
-        lambda *a, **k: contextlib.nullcontext(),
-    )
-    monkeypatch.setattr(
-        notifier.requests,
-        "options",
-        lambda *a, **k: (_ for _ in ()).throw(notifier.requests.RequestException("fail")),
-    )
-    assert notifier._is_hammerspoon_available("http://localhost:9181/alert") is False
-
-
-def test_is_hammerspoon_available_success(monkeypatch):
-    monkeypatch.setattr(
-        notifier.socket,
-        "create_connection",
-        lambda *a, **k: contextlib.nullcontext(),
-    )
-    monkeypatch.setattr(notifier.requests, "options", lambda *a, **k: None)
-    assert notifier._is_hammerspoon_available("http://localhost:9181/alert") is True
+@pytest.mark.parametrize(
+    ("url", "create_conn", "options", "expected"),
+    [
+        ("http://", None, None, False),
+        ("http://localhost:9181/alert", _raise_os_error, None, False),
+        ("http://localhost:9181/alert", lambda *a, **k: contextlib.nullcontext(), _raise_request_error, False),
+        ("http://localhost:9181/alert", lambda *a, **k: contextlib.nullcontext(), lambda *a, **k: None, True),
+    ],
+    ids=["missing_host", "socket_err", "options_err", "success"],
+)
+def test_is_hammerspoon_available(monkeypatch, url, create_conn, options, expected):
+    if create_conn is not None:
+        monkeypatch.setattr(notifier.socket, "create_connection", create_conn)
+    if options is not None:
+        monkeypatch.setattr(notifier.requests, "options", options)
+    assert notifier._is_hammerspoon_available(url) is expected
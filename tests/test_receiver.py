@@ -2,39 +2,20 @@
 
 from unittest.mock import MagicMock
 
-from src.safe_family.urls import receiver
-
-from .conftest import FakeConnection, FakeCursor
-
-
-class MockCursor(FakeCursor):
-    """Cursor that simulates rowcount."""
-
-    def __init__(self, rows=None):
-        super().__init__(rows)
-        self.rowcount = 0
-
-    def execute(self, sql, params=None):
-        super().execute(sql, params)
-        if "INSERT" in sql:
-            self.rowcount = 1
-        else:
-            self.rowcount = 0
+import pytest
 
+from src.safe_family.urls import receiver
 
-class MockConnection(FakeConnection):
-    """Connection returning MockCursor."""
 
-    def __init__(self, rows=None):
-        super().__init__(rows)
-        self.cursor_obj = MockCursor(rows)
+@pytest.fixture
+def logs_db(monkeypatch, sqlite_conn):
+    monkeypatch.setattr(receiver, "get_db_connection", lambda: sqlite_conn)
+    return sqlite_conn
 
 
-def test_receive_log_success(client, monkeypatch):
+def test_receive_log_success(stateless_client, monkeypatch, logs_db):
     """Test successful log pull from AdGuard."""
-    # Mock DB connection - return None for MAX(timestamp) so it defaults to pulling all
-    conn = MockConnection(rows=[(None,)])
-    monkeypatch.setattr(receiver, "get_db_connection", lambda: conn)
+    # Empty table: MAX(timestamp) is NULL so the pull defaults to everything
 
     # Mock AdGuard response
     mock_resp = MagicMock()
@@ -58,59 +39,59 @@ def test_receive_log_success(client, monkeypatch):
     monkeypatch.setattr("requests.get", lambda *args, **kwargs: mock_resp)
 
     # Call the endpoint (POST /logs)
-    resp = client.post("/logs")
+    resp = stateless_client.post("/logs")
 
     assert resp.status_code == 200
     assert resp.json == {"inserted": 2}
 
-    # Verify DB interactions
-    queries = conn.cursor_obj.queries
-    # 1. SELECT MAX(timestamp)
-    # 2. INSERT ... (bad.com) - oldest first
-    # 3. INSERT ... (google.com) - newest last
-
-    selects = [q for q in queries if "SELECT MAX" in q[0]]
-    inserts = [q for q in queries if "INSERT INTO logs" in q[0]]
+    # API returns newest first; rows are stored oldest first
+    rows = logs_db.db.execute("SELECT qh, is_filtered FROM logs ORDER BY id").fetchall()
+    assert rows == [("bad.com", 1), ("google.com", 0)]
+    assert logs_db.commits == 1
 
-    assert len(selects) == 1
-    assert len(inserts) == 2
 
-    # Check oldest log (bad.com)
-    _sql_1, params_1 = inserts[0]
-    assert params_1[2] == "bad.com"  # qh
-    assert params_1[3] is True       # is_filtered (FilteredBlackList)
+def test_receive_log_skips_duplicate_entries(stateless_client, monkeypatch, logs_db):
+    """The same query twice in one pull hits ``ON CONFLICT`` and is stored once."""
+    entry = {"question": {"name": "dup.com"}, "time": "2025-01-29T12:00:00Z", "client": "1.2.3.4"}
+    mock_resp = MagicMock()
+    # Processed oldest (last) first, so the FilteredBlackList copy wins.
+    mock_resp.json.return_value = {
+        "data": [
+            {**entry, "reason": "Rewritten"},
+            {**entry, "reason": "FilteredBlackList"},
+        ],
+    }
+    monkeypatch.setattr("requests.get", lambda *args, **kwargs: mock_resp)
 
-    # Check newest log (google.com)
-    _sql_2, params_2 = inserts[1]
-    assert params_2[2] == "google.com"
-    assert params_2[3] is False      # is_filtered (Rewritten != FilteredBlackList)
+    resp = stateless_client.post("/logs")
 
-    assert conn.commits == 1
+    assert resp.status_code == 200
+    assert resp.json == {"inserted": 1}
+    rows = logs_db.db.execute("SELECT qh, is_filtered FROM logs").fetchall()
+    assert rows == [("dup.com", 1)]
 
 
-def test_receive_log_adguard_failure(client, monkeypatch):
+@pytest.mark.usefixtures("logs_db")
+def test_receive_log_adguard_failure(stateless_client, monkeypatch):
     """Test failure when pulling from AdGuard."""
-    conn = FakeConnection(rows=[(None,)])
-    monkeypatch.setattr(receiver, "get_db_connection", lambda: conn)
-
     def _fail(*args, **kwargs):
         raise Exception("AdGuard Network Error")
 
     monkeypatch.setattr("requests.get", _fail)
 
-    resp = client.post("/logs")
+    resp = stateless_client.post("/logs")
     assert resp.status_code == 500
     assert "AdGuard Network Error" in resp.json["error"]
 
 
-def test_receive_log_db_error(client, monkeypatch):
+def test_receive_log_db_error(stateless_client, monkeypatch):
     """Test DB connection failure."""
     def _raise():
         raise Exception("DB Connection Failed")
 
     monkeypatch.setattr(receiver, "get_db_connection", _raise)
 
-    resp = client.post("/logs")
+    resp = stateless_client.post("/logs")
 
     assert resp.status_code == 500
     assert "DB Connection Failed" in resp.json["error"]
@@ -1,33 +1,23 @@
 """Route and CLI tests using shared fixtures."""
 
+from .conftest import login, make_user
 
-def test_root_redirects_to_todo(client):
-    resp = client.get("/")
+
+def test_root_redirects_to_todo(stateless_client):
+    resp = stateless_client.get("/")
     assert resp.status_code == 302
     assert resp.headers["Location"].endswith("/todo")
 
 
-def test_store_sum_renders_when_logged_in(client, monkeypatch):
-    # Bypass JWT validation and provide a session token
-    monkeypatch.setattr(
-        "src.safe_family.core.auth.decode_token",
-        lambda token: {"sub": "user"},
-    )
-    with client.session_transaction() as sess:
-        sess["access_token"] = "token"
+def test_store_sum_renders_when_logged_in(client):
+    login(client)
 
     resp = client.get("/store_sum")
     assert resp.status_code == 200
 
 
-def test_calc_guide_renders_when_logged_in(client, monkeypatch):
-    # Bypass JWT validation and provide a session token
-    monkeypatch.setattr(
-        "src.safe_family.core.auth.decode_token",
-        lambda token: {"sub": "user"},
-    )
-    with client.session_transaction() as sess:
-        sess["access_token"] = "token"
+def test_calc_guide_renders_when_logged_in(client):
+    login(client)
 
     resp = client.get("/calc_guide")
     assert resp.status_code == 200
@@ -35,14 +25,8 @@ def test_calc_guide_renders_when_logged_in(client, monkeypatch):
     assert b"Store Accounting Tool" in resp.data
 
 
-def test_yaw_calc_renders_when_logged_in(client, monkeypatch):
-    # Bypass JWT validation and provide a session token
-    monkeypatch.setattr(
-        "src.safe_family.core.auth.decode_token",
-        lambda token: {"sub": "user"},
-    )
-    with client.session_transaction() as sess:
-        sess["access_token"] = "token"
+def test_yaw_calc_renders_when_logged_in(client):
+    login(client)
 
     resp = client.get("/yaw_calc")
     assert resp.status_code == 200
@@ -51,10 +35,8 @@ def test_yaw_calc_renders_when_logged_in(client, monkeypatch):
 
 def _countdown_login(notesync_client, monkeypatch, user_id="user-1"):
     from src.safe_family.core.extensions import db
-    from src.safe_family.core.models import User
 
-    user = User(id=user_id, username="alice", email="a@example.com")
-    user.set_password("secret")
+    user = make_user(user_id, "alice", "a@example.com")
     db.session.add(user)
     db.session.commit()
 
@@ -62,8 +44,7 @@ def _countdown_login(notesync_client, monkeypatch, user_id="user-1"):
         "src.safe_family.core.auth.decode_token",
         lambda token: {"sub": user_id},
     )
-    with notesync_client.session_transaction() as sess:
-        sess["access_token"] = "token"
+    login(notesync_client, "token")
     return user
 
 
@@ -126,14 +107,8 @@ def test_countdown_save_rejects_bad_date(notesync_client, monkeypatch):
     assert CountdownConfig.query.count() == 0
 
 
-def test_store_sum_static_renders_when_logged_in(client, monkeypatch):
-    # Bypass JWT validation and provide a session token
-    monkeypatch.setattr(
-        "src.safe_family.core.auth.decode_token",
-        lambda token: {"sub": "user"},
-    )
-    with client.session_transaction() as sess:
-        sess["access_token"] = "token"
+def test_store_sum_static_renders_when_logged_in(client):
+    login(client)
 
     resp = client.get("/store_sum_static")
     assert resp.status_code == 200
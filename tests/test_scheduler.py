@@ -1,77 +1,29 @@
 """Tests for scheduler utilities."""
 
 from datetime import time
-from types import SimpleNamespace
+from unittest.mock import MagicMock
 
 from src.safe_family.rules import scheduler
 
-
-class QueueCursor:
-    """Cursor stub returning queued rows."""
-
-    def __init__(self, rows):
-        self.rows = rows
-        self.executed = []
-
-    def execute(self, sql, params=None):
-        self.executed.append((sql, params))
-
-    def fetchall(self):
-        return list(self.rows)
-
-    def close(self):
-        return None
-
-
-class QueueConn:
-    def __init__(self, rows):
-        self.cursor_obj = QueueCursor(rows)
-        self.closed = False
-
-    def cursor(self):
-        return self.cursor_obj
-
-    def close(self):
-        self.closed = True
-
-
-class FakeScheduler:
-    def __init__(self):
-        self.jobs = []
-        self.removed = False
-
-    def remove_all_jobs(self):
-        self.removed = True
-        self.jobs = []
-
-    def add_job(self, func, trigger, **kwargs):
-        job_id = kwargs.get("id")
-        self.jobs.append(
-            SimpleNamespace(
-                id=job_id,
-                func=func,
-                trigger=trigger,
-            ),
-        )
-
-    def get_jobs(self):
-        return [SimpleNamespace(id=job.id, name=getattr(job.func, "__name__", ""), trigger=job.trigger, next_run_time=None) for job in self.jobs]
+from .conftest import FakeConnection
 
 
 def test_load_schedules_adds_jobs(monkeypatch):
     rows = [
         (1, "Rule enable all except AI", time(9, 0), "1,2"),
     ]
-    conn = QueueConn(rows)
-    fake_scheduler = FakeScheduler()
+    conn = FakeConnection(rows)
+    fake_scheduler = MagicMock(spec=scheduler.BackgroundScheduler)
+    fake_scheduler.get_jobs.return_value = []
     monkeypatch.setattr(scheduler, "get_db_connection", lambda: conn)
     monkeypatch.setattr(scheduler, "scheduler", fake_scheduler)
     monkeypatch.setattr(scheduler.logger, "info", lambda *a, **k: None)
 
     scheduler.load_schedules()
 
-    assert fake_scheduler.removed
+    fake_scheduler.remove_all_jobs.assert_called_once_with()
+    job_ids = [call.kwargs["id"] for call in fake_scheduler.add_job.call_args_list]
     # One DB job + analyze_logs + gas_weather_report + notify_overdue_task_feedback + run_adguard_pull
-    assert len(fake_scheduler.jobs) == 5
-    assert fake_scheduler.jobs[0].id == "rule_1"
-    assert "gas_weather_report" in {job.id for job in fake_scheduler.jobs}
+    assert len(job_ids) == 5
+    assert job_ids[0] == "rule_1"
+    assert "gas_weather_report" in job_ids
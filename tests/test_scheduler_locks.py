@@ -1,98 +1,96 @@
 """Tests for scheduler lock helpers and routes."""
 
+from dataclasses import dataclass
 from datetime import UTC, datetime, time
 from types import SimpleNamespace
 
-from src.safe_family.core import auth
-from src.safe_family.rules import scheduler
-
-
-class LockCursor:
-    def __init__(self, locked=True, rows=None):
-        self.locked = locked
-        self.rows = rows or []
-        self.executed = []
-
-    def execute(self, sql, params=None):
-        self.executed.append((sql, params))
-
-    def fetchone(self):
-        return (self.locked,)
+import pytest
 
-    def fetchall(self):
-        return list(self.rows)
-
-    def close(self):
-        return None
+from src.safe_family.rules import scheduler
 
+from .conftest import (
+    FakeConnection,
+    FakeCursor,
+    assert_sql,
+    conn_slot,
+    login,
+    stub_render,
+)
 
-class LockConn:
-    def __init__(self, cursor):
-        self.cursor_obj = cursor
-        self.closed = 0
-        self.autocommit = False
 
-    def cursor(self):
-        return self.cursor_obj
+@dataclass(frozen=True, slots=True)
+class JobView:
+    """Minimal APScheduler job shape read by get_scheduled_job_details."""
 
-    def commit(self):
-        return None
+    id: str
+    name: str
+    trigger: object
+    next_run_time: datetime | None = None
 
-    def close(self):
-        self.closed = 1
 
+NEXT_RUN = datetime(2025, 1, 1, 12, 0, tzinfo=UTC)
 
-def _login_admin(client, monkeypatch):
-    monkeypatch.setattr(
-        auth,
-        "decode_token",
-        lambda token: {"sub": "admin", "is_admin": "admin"},
-    )
-    with client.session_transaction() as sess:
-        sess["access_token"] = "token"
 
+@pytest.fixture(autouse=True)
+def _reset_scheduler_state(monkeypatch):
+    """Start each test with no leader, job locks or overdue-alert history."""
+    monkeypatch.setattr(scheduler, "_JOB_LOCKS", {})
+    monkeypatch.setattr(scheduler, "_NOTIFIED_TASK_IDS", set())
+    monkeypatch.setattr(scheduler, "_NOTIFIED_DATE", None)
+    monkeypatch.setattr(scheduler, "_IS_SCHEDULER_LEADER", False)
+    monkeypatch.setattr(scheduler, "_SCHEDULER_LEADER_CONN", None)
 
-def test_ensure_scheduler_leader_acquires_lock(monkeypatch):
-    cursor = LockCursor(locked=True)
-    conn = LockConn(cursor)
-    monkeypatch.setattr(scheduler, "get_db_connection", lambda: conn)
-    scheduler._IS_SCHEDULER_LEADER = False
-    scheduler._SCHEDULER_LEADER_CONN = None
 
-    assert scheduler._ensure_scheduler_leader() is True
-    assert scheduler._IS_SCHEDULER_LEADER is True
-    assert scheduler._SCHEDULER_LEADER_CONN is conn
+@pytest.fixture(scope="class")
+def _conn_slot():
+    """Patch scheduler.get_db_connection once per class for ``use_conn``."""
+    with conn_slot(scheduler) as use_conn:
+        yield use_conn
 
 
-def test_ensure_scheduler_leader_not_acquired(monkeypatch):
-    cursor = LockCursor(locked=False)
-    conn = LockConn(cursor)
-    monkeypatch.setattr(scheduler, "get_db_connection", lambda: conn)
-    scheduler._IS_SCHEDULER_LEADER = False
-    scheduler._SCHEDULER_LEADER_CONN = None
+@pytest.fixture
+def use_conn(_conn_slot):
+    """Return a setter that makes ``conn`` the next scheduler connection."""
+    yield _conn_slot
+    _conn_slot(None)
 
-    assert scheduler._ensure_scheduler_leader() is False
-    assert conn.closed == 1
 
+def _try_advisory_lock(conn, key):
+    cur = conn.cursor()
+    cur.execute("SELECT pg_try_advisory_lock(%s)", (key,))
+    locked = cur.fetchone()[0]
+    cur.close()
+    return locked
 
-def test_ensure_job_lock_sets_connection(monkeypatch):
-    cursor = LockCursor(locked=True)
-    conn = LockConn(cursor)
-    monkeypatch.setattr(scheduler, "get_db_connection", lambda: conn)
-    scheduler._JOB_LOCKS.clear()
 
-    assert scheduler._ensure_job_lock("job-1") is True
-    assert "job-1" in scheduler._JOB_LOCKS
+@pytest.mark.postgres
+def test_scheduler_leader_lock_is_exclusive(monkeypatch, pg_connect):
+    monkeypatch.setattr(scheduler, "get_db_connection", pg_connect)
 
-
-def test_ensure_job_lock_returns_false(monkeypatch):
-    cursor = LockCursor(locked=False)
-    conn = LockConn(cursor)
-    monkeypatch.setattr(scheduler, "get_db_connection", lambda: conn)
-    scheduler._JOB_LOCKS.clear()
-
-    assert scheduler._ensure_job_lock("job-2") is False
-    assert conn.closed == 1
+    assert scheduler._ensure_scheduler_leader() is True
+    other = pg_connect()
+    try:
+        assert _try_advisory_lock(other, scheduler._SCHEDULER_LEADER_LOCK_KEY) is False
+    finally:
+        other.close()
+        scheduler._release_scheduler_leader()
+
+
+@pytest.mark.postgres
+def test_job_lock_released_for_unscheduled_jobs(monkeypatch, pg_connect):
+    monkeypatch.setattr(scheduler, "get_db_connection", pg_connect)
+    key = scheduler._job_lock_key("pg-job")
+
+    other = pg_connect()
+    try:
+        assert scheduler._ensure_job_lock("pg-job") is True
+        assert _try_advisory_lock(other, key) is False
+        scheduler._release_unused_job_locks(set())
+        assert _try_advisory_lock(other, key) is True
+    finally:
+        # Idempotent; closes the lock connection if an assertion failed first.
+        scheduler._release_unused_job_locks(set())
+        other.close()
 
 
 def test_wrap_job_skips_when_not_leader(monkeypatch):
@@ -106,8 +104,7 @@ def test_wrap_job_skips_when_not_leader(monkeypatch):
 
 
 def test_release_unused_job_locks_closes_connections():
-    conn = LockConn(LockCursor())
-    scheduler._JOB_LOCKS.clear()
+    conn = FakeConnection()
     scheduler._JOB_LOCKS["job-4"] = conn
 
     scheduler._release_unused_job_locks(set())
@@ -115,109 +112,6 @@ def test_release_unused_job_locks_closes_connections():
     assert conn.closed == 1
 
 
-def test_notify_schedule_change_executes_query(monkeypatch):
-    cursor = LockCursor()
-    conn = LockConn(cursor)
-    monkeypatch.setattr(scheduler, "get_db_connection", lambda: conn)
-
-    scheduler.notify_schedule_change()
-
-    assert any("pg_notify" in sql for sql, _ in cursor.executed)
-
-
-def test_notify_overdue_task_feedback_sends_alert(monkeypatch):
-    time_slot = "00:00 - 00:00"
-    cursor = LockCursor(rows=[(1, "alice", time_slot, "Task")])
-    conn = LockConn(cursor)
-    monkeypatch.setattr(scheduler, "get_db_connection", lambda: conn)
-    sent = {}
-    monkeypatch.setattr(
-        scheduler,
-        "send_hammerspoon_alert",
-        lambda msg: sent.__setitem__("msg", msg),
-    )
-    scheduler._NOTIFIED_TASK_IDS.clear()
-    scheduler._NOTIFIED_DATE = None
-
-    scheduler.notify_overdue_task_feedback()
-
-    assert "msg" in sent
-
-
-def test_schedule_rules_add_rule(client, monkeypatch):
-    cursor = LockCursor(rows=[])
-    cursor.fetchone = lambda: (42,)
-    conn = LockConn(cursor)
-    monkeypatch.setattr(scheduler, "get_db_connection", lambda: conn)
-    monkeypatch.setattr(scheduler, "load_schedules", lambda: None)
-    monkeypatch.setattr(scheduler, "notify_schedule_change", lambda: None)
-    _login_admin(client, monkeypatch)
-
-    resp = client.post(
-        "/schedule_rules",
-        data={
-            "action": "add",
-            "rule_name": "Rule enable all",
-            "start_time": "09:00",
-            "end_time": "",
-        },
-    )
-
-    assert resp.status_code == 302
-    assert any("INSERT INTO schedule_rules" in sql for sql, _ in cursor.executed)
-
-
-def test_schedule_rules_get_renders(client, monkeypatch):
-    cursor = LockCursor(rows=[("u1", "alice", None), (1, "Rule enable all", "09:00", None, "*", True)])
-    conn = LockConn(cursor)
-    monkeypatch.setattr(scheduler, "get_db_connection", lambda: conn)
-    monkeypatch.setattr(scheduler, "get_scheduled_job_details", list)
-    monkeypatch.setattr(scheduler, "render_template", lambda *a, **k: ("ok", 200))
-    _login_admin(client, monkeypatch)
-
-    resp = client.get("/schedule_rules")
-
-    assert resp.status_code == 200
-
-
-def test_schedule_rules_get_renders_real_template(client, monkeypatch):
-    class RenderCursor(LockCursor):
-        def fetchall(self):
-            sql = self.executed[-1][0]
-            if "FROM users" in sql:
-                return [("u1", "alice", "Rule enable AI")]
-            if "FROM schedule_rules" in sql:
-                return [
-                    (1, "Rule enable AI", time(9, 0), time(11, 30), "0,1,2", True),
-                    (2, "Rule disable all", time(21, 0), None, "*", False),
-                ]
-            return [("show_disable_button_start", "16:00")]
-
-    cursor = RenderCursor()
-    conn = LockConn(cursor)
-    monkeypatch.setattr(scheduler, "get_db_connection", lambda: conn)
-    monkeypatch.setattr(
-        scheduler,
-        "get_scheduled_job_details",
-        lambda: [
-            {"id": "analyze_logs", "name": "analyze_logs", "trigger": "cron", "next_run_time": "2026-07-13 00:20:00 CDT"},
-            {"id": "gas_weather_report", "name": "gas_weather_report", "trigger": "cron", "next_run_time": "-"},
-        ],
-    )
-    _login_admin(client, monkeypatch)
-
-    resp = client.get("/schedule_rules")
-
-    assert resp.status_code == 200
-    html = resp.get_data(as_text=True)
-    assert "Schedule rules" in html
-    assert "Rule enable AI" in html
-    assert "sched-timeline" in html
-    assert "1 rules active" in html
-    assert "00:20" in html
-    assert "— paused" in html
-
-
 def test_log_job_event_handles_exception():
     event = SimpleNamespace(job_id="job-x", exception=Exception("boom"), retval=None)
     scheduler._log_job_event(event)
@@ -229,8 +123,7 @@ def test_log_job_event_skips_job():
 
 
 def test_get_scheduled_job_details_formats_times(monkeypatch):
-    next_run = datetime(2025, 1, 1, 12, 0, tzinfo=UTC)
-    job = SimpleNamespace(id="job-1", name="job", trigger="cron", next_run_time=next_run)
+    job = JobView("job-1", "job", "cron", NEXT_RUN)
     monkeypatch.setattr(scheduler.scheduler, "get_jobs", lambda: [job])
 
     details = scheduler.get_scheduled_job_details()
@@ -244,50 +137,210 @@ def test_remove_job_handles_missing(monkeypatch):
     scheduler.remove_job(123)
 
 
-def test_schedule_rules_update_action(client, monkeypatch):
-    cursor = LockCursor()
-    conn = LockConn(cursor)
-    monkeypatch.setattr(scheduler, "get_db_connection", lambda: conn)
-    monkeypatch.setattr(scheduler, "load_schedules", lambda: None)
-    monkeypatch.setattr(scheduler, "notify_schedule_change", lambda: None)
-    _login_admin(client, monkeypatch)
+def test_analyze_logs_calls_log_analysis(monkeypatch):
+    called = {}
 
-    resp = client.post(
-        "/schedule_rules",
-        data={
-            "action": "update",
-            "rule_id": "1",
-            "start_time": "09:00",
-            "end_time": "",
-            "day_of_week": [],
-        },
-    )
+    monkeypatch.setattr(scheduler, "get_time_range", lambda **k: ("start", "end"))
+    monkeypatch.setattr(scheduler, "log_analysis", lambda start, end: called.__setitem__("args", (start, end)))
 
-    assert resp.status_code == 302
-    assert any("UPDATE schedule_rules" in sql for sql, _ in cursor.executed)
+    scheduler.analyze_logs()
 
+    assert called["args"] == ("start", "end")
 
-def test_schedule_rules_assign_action(client, monkeypatch):
-    cursor = LockCursor()
-    conn = LockConn(cursor)
-    monkeypatch.setattr(scheduler, "get_db_connection", lambda: conn)
-    _login_admin(client, monkeypatch)
 
-    resp = client.post(
-        "/schedule_rules",
-        data={"action": "assign", "rule_u1": "Rule enable all"},
-    )
+class TestSchedulerLocks:
+    """Leader, job-lock and LISTEN/NOTIFY helpers against a fake connection."""
 
-    assert resp.status_code == 302
-    assert any("INSERT INTO user_rule_assignment" in sql for sql, _ in cursor.executed)
+    def test_ensure_scheduler_leader_acquires_lock(self, use_conn):
+        conn = use_conn(FakeConnection([(True,)]))
 
+        assert scheduler._ensure_scheduler_leader() is True
+        assert scheduler._IS_SCHEDULER_LEADER is True
+        assert scheduler._SCHEDULER_LEADER_CONN is conn
 
-def test_analyze_logs_calls_log_analysis(monkeypatch):
-    called = {}
+    def test_ensure_scheduler_leader_not_acquired(self, use_conn):
+        conn = use_conn(FakeConnection([(False,)]))
 
-    monkeypatch.setattr(scheduler, "get_time_range", lambda **k: ("start", "end"))
-    monkeypatch.setattr(scheduler, "log_analysis", lambda start, end: called.__setitem__("args", (start, end)))
+        assert scheduler._ensure_scheduler_leader() is False
+        assert conn.closed == 1
 
-    scheduler.analyze_logs()
+    def test_ensure_job_lock_sets_connection(self, use_conn):
+        use_conn(FakeConnection([(True,)]))
 
-    assert called["args"] == ("start", "end")
+        assert scheduler._ensure_job_lock("job-1") is True
+        assert "job-1" in scheduler._JOB_LOCKS
+
+    def test_ensure_job_lock_returns_false(self, use_conn):
+        conn = use_conn(FakeConnection([(False,)]))
+
+        assert scheduler._ensure_job_lock("job-2") is False
+        assert conn.closed == 1
+
+    def test_notify_schedule_change_executes_query(self, use_conn):
+        cursor = FakeCursor()
+        use_conn(FakeConnection(cursor=cursor))
+
+        scheduler.notify_schedule_change()
+
+        assert_sql(cursor.executed, "pg_notify")
+
+    def test_listen_once_reloads_on_foreign_notification(self, use_conn, monkeypatch):
+        conn = use_conn(FakeConnection())
+        conn.notifies = [
+            SimpleNamespace(payload=scheduler._SCHEDULER_INSTANCE_ID),
+            SimpleNamespace(payload="other-instance"),
+        ]
+        conn.poll = lambda: None
+        monkeypatch.setattr(scheduler.select, "select", lambda *a: ([conn], [], []))
+        reloads = []
+
+        def _reload():
+            reloads.append(True)
+            scheduler._LISTENER_STOP.set()
+
+        monkeypatch.setattr(scheduler, "load_schedules", _reload)
+        try:
+            scheduler._listen_once()
+        finally:
+            scheduler._LISTENER_STOP.clear()
+
+        assert reloads == [True]
+        assert conn.autocommit is True
+        assert conn.closed == 1
+        assert_sql(conn.cursor_obj.executed, "LISTEN")
+
+    @pytest.mark.parametrize(("disabled", "expected_starts"), [(True, 0), (False, 1)])
+    def test_start_schedule_listener_honours_opt_out(self, monkeypatch, disabled, expected_starts):
+        starts = []
+
+        class _Thread:
+            def __init__(self, **_kwargs):
+                pass
+
+            def start(self):
+                starts.append(self)
+
+        monkeypatch.setattr(scheduler.settings, "DISABLE_SCHEDULE_LISTENER", disabled)
+        monkeypatch.setattr(scheduler, "_LISTENER_THREAD", None)
+        monkeypatch.setattr(scheduler.threading, "Thread", _Thread)
+
+        scheduler._start_schedule_listener()
+
+        assert len(starts) == expected_starts
+
+    def test_notify_overdue_task_feedback_sends_alert(self, use_conn, monkeypatch):
+        time_slot = "00:00 - 00:00"
+        use_conn(FakeConnection([(1, "alice", time_slot, "Task")]))
+        sent = {}
+        monkeypatch.setattr(
+            scheduler,
+            "send_hammerspoon_alert",
+            lambda msg: sent.__setitem__("msg", msg),
+        )
+
+        scheduler.notify_overdue_task_feedback()
+
+        assert "msg" in sent
+
+
+class TestScheduleRulesRoutes:
+    """/schedule_rules view actions against a fake connection."""
+
+    def test_schedule_rules_add_rule(self, use_conn, client, monkeypatch):
+        cursor = FakeCursor(fetchone_values=[(42,)])
+        use_conn(FakeConnection(cursor=cursor))
+        monkeypatch.setattr(scheduler, "load_schedules", lambda: None)
+        monkeypatch.setattr(scheduler, "notify_schedule_change", lambda: None)
+        login(client, "admin")
+
+        resp = client.post(
+            "/schedule_rules",
+            data={
+                "action": "add",
+                "rule_name": "Rule enable all",
+                "start_time": "09:00",
+                "end_time": "",
+            },
+        )
+
+        assert resp.status_code == 302
+        assert_sql(cursor.executed, "INSERT INTO schedule_rules")
+
+    def test_schedule_rules_get_renders(self, use_conn, client, monkeypatch):
+        use_conn(FakeConnection([("u1", "alice", None), (1, "Rule enable all", "09:00", None, "*", True)]))
+        monkeypatch.setattr(scheduler, "get_scheduled_job_details", list)
+        monkeypatch.setattr(scheduler, "render_template", stub_render)
+        login(client, "admin")
+
+        resp = client.get("/schedule_rules")
+
+        assert resp.status_code == 200
+
+    def test_schedule_rules_get_renders_real_template(self, use_conn, client, monkeypatch):
+        class RenderCursor(FakeCursor):
+            def fetchall(self):
+                sql = self.executed[-1][0]
+                if "FROM users" in sql:
+                    return [("u1", "alice", "Rule enable AI")]
+                if "FROM schedule_rules" in sql:
+                    return [
+                        (1, "Rule enable AI", time(9, 0), time(11, 30), "0,1,2", True),
+                        (2, "Rule disable all", time(21, 0), None, "*", False),
+                    ]
+                return [("show_disable_button_start", "16:00")]
+
+        use_conn(FakeConnection(cursor=RenderCursor()))
+        monkeypatch.setattr(
+            scheduler,
+            "get_scheduled_job_details",
+            lambda: [
+                {"id": "analyze_logs", "name": "analyze_logs", "trigger": "cron", "next_run_time": "2026-07-13 00:20:00 CDT"},
+                {"id": "gas_weather_report", "name": "gas_weather_report", "trigger": "cron", "next_run_time": "-"},
+            ],
+        )
+        login(client, "admin")
+
+        resp = client.get("/schedule_rules")
+
+        assert resp.status_code == 200
+        html = resp.get_data(as_text=True)
+        assert "Schedule rules" in html
+        assert "Rule enable AI" in html
+        assert "sched-timeline" in html
+        assert "1 rules active" in html
+        assert "00:20" in html
+        assert "— paused" in html
+
+    def test_schedule_rules_update_action(self, use_conn, client, monkeypatch):
+        cursor = FakeCursor()
+        use_conn(FakeConnection(cursor=cursor))
+        monkeypatch.setattr(scheduler, "load_schedules", lambda: None)
+        monkeypatch.setattr(scheduler, "notify_schedule_change", lambda: None)
+        login(client, "admin")
+
+        resp = client.post(
+            "/schedule_rules",
+            data={
+                "action": "update",
+                "rule_id": "1",
+                "start_time": "09:00",
+                "end_time": "",
+                "day_of_week": [],
+            },
+        )
+
+        assert resp.status_code == 302
+        assert_sql(cursor.executed, "UPDATE schedule_rules")
+
+    def test_schedule_rules_assign_action(self, use_conn, client):
+        cursor = FakeCursor()
+        use_conn(FakeConnection(cursor=cursor))
+        login(client, "admin")
+
+        resp = client.post(
+            "/schedule_rules",
+            data={"action": "assign", "rule_u1": "Rule enable all"},
+        )
+
+        assert resp.status_code == 302
+        assert_sql(cursor.executed, "INSERT INTO user_rule_assignment")
@@ -1,71 +1,48 @@
 """Tests for todo routes and helpers."""
 
 from datetime import datetime
-from types import SimpleNamespace
 
-from src.safe_family.core import auth
+import pytest
+
 from src.safe_family.core.extensions import local_tz
 from src.safe_family.todo import todo
 
+from .conftest import (
+    FakeConnection,
+    UserView,
+    freeze_now,
+    login,
+    sql_params,
+    stub_render,
+)
 
-def _freeze_time(monkeypatch, hour, minute):
-    """Pin todo.datetime.now() to a fixed local time for deterministic tests."""
-    frozen = local_tz.localize(datetime(2026, 7, 11, hour, minute))
-
-    class FrozenDatetime(datetime):
-        @classmethod
-        def now(cls, tz=None):
-            return frozen
-
-    monkeypatch.setattr(todo, "datetime", FrozenDatetime)
-
-
-class SeqCursor:
-    """Cursor that returns queued fetchone/fetchall results."""
-
-    def __init__(self, fetchone_values, fetchall_values):
-        self.fetchone_values = list(fetchone_values)
-        self.fetchall_values = list(fetchall_values)
-        self.queries = []
-
-    def execute(self, sql, params=None):
-        self.queries.append((sql, params))
-
-    def fetchone(self):
-        return self.fetchone_values.pop(0)
-
-    def fetchall(self):
-        return self.fetchall_values.pop(0)
-
-    def close(self):
-        return None
-
+pytestmark = pytest.mark.usefixtures("_todo_conn_slot", "_silence_todo_side_effects")
 
-class SeqConnection:
-    """Connection wrapper for SeqCursor."""
+ADMIN = UserView("admin", "admin")
+KID = UserView("kid")
+USER = UserView("user")
 
-    def __init__(self, cursor):
-        self.cursor_obj = cursor
-        self.commits = 0
 
-    def cursor(self):
-        return self.cursor_obj
+@pytest.fixture(scope="module", autouse=True)
+def _stub_todo_views():
+    """Stub out templates once for every test in this module."""
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(todo, "render_template", stub_render)
+        yield
 
-    def commit(self):
-        self.commits += 1
 
-    def close(self):
-        return None
+# Slot and grace-window tests reason from 12:15 local time.
+FROZEN_NOW = local_tz.localize(datetime(2026, 7, 11, 12, 15))
 
 
-def _login_session(client, monkeypatch):
-    monkeypatch.setattr(auth, "decode_token", lambda token: {"sub": "user"})
-    with client.session_transaction() as sess:
-        sess["access_token"] = "token"
+@pytest.fixture
+def frozen_now(monkeypatch):
+    """Pin todo.datetime.now() to FROZEN_NOW for deterministic tests."""
+    return freeze_now(monkeypatch, todo, FROZEN_NOW)
 
 
-def test_todo_page_admin_renders(client, monkeypatch):
-    cursor = SeqCursor(
+def test_todo_page_admin_renders(client, use_todo_conn, monkeypatch):
+    conn = FakeConnection(
         fetchone_values=[("admin", "1")],
         fetchall_values=[
             [("admin",), ("user",)],  # users_list
@@ -73,16 +50,14 @@ def test_todo_page_admin_renders(client, monkeypatch):
             [],  # week strip / heatmap history
         ],
     )
-    conn = SeqConnection(cursor)
-    monkeypatch.setattr(todo, "get_db_connection", lambda: conn)
+    use_todo_conn(conn)
     monkeypatch.setattr(todo, "get_agile_config", lambda k, d="": d)
     monkeypatch.setattr(
         todo,
         "get_current_username",
-        lambda: SimpleNamespace(username="admin", role="admin"),
+        lambda: ADMIN,
     )
-    monkeypatch.setattr(todo, "render_template", lambda *a, **k: ("ok", 200))
-    _login_session(client, monkeypatch)
+    login(client)
 
     resp = client.get("/todo")
 
@@ -90,11 +65,9 @@ def test_todo_page_admin_renders(client, monkeypatch):
     assert conn.commits == 0
 
 
-def test_update_todo_sends_notifications(client, monkeypatch):
-    from .conftest import FakeConnection
-
+def test_update_todo_sends_notifications(client, use_todo_conn, monkeypatch):
     conn = FakeConnection(rows=[("09:00 - 10:00", "Read", "")])
-    monkeypatch.setattr(todo, "get_db_connection", lambda: conn)
+    use_todo_conn(conn)
     sent_email = []
     sent_discord = []
     monkeypatch.setattr(todo, "send_email_notification", lambda *a: sent_email.append(a))
@@ -103,7 +76,7 @@ def test_update_todo_sends_notifications(client, monkeypatch):
         "send_discord_notification",
         lambda *a: sent_discord.append(a),
     )
-    _login_session(client, monkeypatch)
+    login(client)
 
     resp = client.post(
         "/update_todo/alice",
@@ -115,43 +88,42 @@ def test_update_todo_sends_notifications(client, monkeypatch):
     assert sent_discord
 
 
-def test_done_todo_updates_status(client, monkeypatch):
-    from .conftest import FakeConnection
-
+def test_done_todo_updates_status(frozen_now, client, use_todo_conn):
     # Now 12:15, slot ends 13:00: manual check before end, no default status.
-    _freeze_time(monkeypatch, 12, 15)
     conn = FakeConnection(rows=[("12:00 - 13:00", "Task", "")])
-    monkeypatch.setattr(todo, "get_db_connection", lambda: conn)
-    monkeypatch.setattr(todo, "flash", lambda *a, **k: None)
-    _login_session(client, monkeypatch)
+    use_todo_conn(conn)
+    login(client)
 
     resp = client.post("/todo/mark_done", json={"id": 5, "completed": True})
 
     assert resp.status_code == 200
-    assert any(
-        "UPDATE todo_list" in sql and params == (True, 5)
-        for sql, params in conn.cursor_obj.queries
-    )
-
-
-def test_done_todo_no_default_status_within_grace(client, monkeypatch):
-    from .conftest import FakeConnection
-
-    # Now 12:15, slot ended 12:00: inside the 30-min grace window the task is
-    # auto-completed but the status stays empty so the user can still choose.
-    _freeze_time(monkeypatch, 12, 15)
-    conn = FakeConnection(rows=[("11:00 - 12:00", "Math homework", "")])
-    monkeypatch.setattr(todo, "get_db_connection", lambda: conn)
-    monkeypatch.setattr(todo, "flash", lambda *a, **k: None)
-    _login_session(client, monkeypatch)
+    assert (True, 5) in sql_params(conn.cursor_obj.executed, "UPDATE todo_list")
+
+
+@pytest.mark.usefixtures("frozen_now")
+@pytest.mark.parametrize(
+    ("row", "expected"),
+    [
+        # Slot ended 12:00: inside the 30-min grace window the task is
+        # auto-completed but the status stays empty so the user can still choose.
+        (("11:00 - 12:00", "Math homework", ""), None),
+        # Grace is over but the user already chose a status: never overwrite it.
+        (("11:00 - 11:40", "Math homework", "done"), "done"),
+    ],
+    ids=["within-grace", "keeps-existing"],
+)
+def test_done_todo_auto_complete_leaves_status(client, use_todo_conn, row, expected):
+    conn = FakeConnection(rows=[row])
+    use_todo_conn(conn)
+    login(client)
 
     resp = client.post("/todo/mark_done", json={"id": 4, "completed": False})
 
     assert resp.status_code == 200
-    assert resp.get_json()["completion_status"] is None
+    assert resp.get_json()["completion_status"] == expected
     update_queries = [
         (sql, params)
-        for sql, params in conn.cursor_obj.queries
+        for sql, params in conn.cursor_obj.executed
         if "UPDATE todo_list" in sql
     ]
     assert update_queries == [
@@ -159,128 +131,62 @@ def test_done_todo_no_default_status_within_grace(client, monkeypatch):
     ]
 
 
-def test_done_todo_auto_complete_true_gets_default_status(client, monkeypatch):
-    from .conftest import FakeConnection
-
-    # Now 12:15, slot ended 11:40: grace (ends 12:10) is over.
-    _freeze_time(monkeypatch, 12, 15)
-    conn = FakeConnection(rows=[("11:00 - 11:40", "Math homework", "")])
-    monkeypatch.setattr(todo, "get_db_connection", lambda: conn)
-    monkeypatch.setattr(todo, "flash", lambda *a, **k: None)
-    _login_session(client, monkeypatch)
-
-    resp = client.post("/todo/mark_done", json={"id": 9, "completed": True})
+# Now 12:15, slot ended 11:40: grace (ends 12:10) is over, so a default
+# status is filled in whether the user ticked the task or it auto-completed.
+@pytest.mark.usefixtures("frozen_now")
+@pytest.mark.parametrize(
+    ("task", "completed", "expected"),
+    [
+        ("Math homework", True, "mostly done"),
+        ("Math homework", False, "mostly done"),
+        ("Sleep early", False, "skipped"),
+    ],
+    ids=["checked", "auto-complete", "sleep-task"],
+)
+def test_done_todo_default_status_after_grace(client, use_todo_conn, task, completed, expected):
+    conn = FakeConnection(rows=[("11:00 - 11:40", task, "")])
+    use_todo_conn(conn)
+    login(client)
+
+    resp = client.post("/todo/mark_done", json={"id": 9, "completed": completed})
 
     assert resp.status_code == 200
-    assert resp.get_json()["completion_status"] == "mostly done"
-    assert any(
-        "completion_status" in sql and params == (True, "mostly done", 9)
-        for sql, params in conn.cursor_obj.queries
-    )
-
+    assert resp.get_json()["completion_status"] == expected
+    assert (True, expected, 9) in sql_params(conn.cursor_obj.executed, "completion_status")
 
-def test_done_todo_defaults_to_mostly_done_after_grace(client, monkeypatch):
-    from .conftest import FakeConnection
-
-    _freeze_time(monkeypatch, 12, 15)
-    conn = FakeConnection(rows=[("11:00 - 11:40", "Math homework", "")])
-    monkeypatch.setattr(todo, "get_db_connection", lambda: conn)
-    monkeypatch.setattr(todo, "flash", lambda *a, **k: None)
-    _login_session(client, monkeypatch)
-
-    resp = client.post("/todo/mark_done", json={"id": 6, "completed": False})
-
-    assert resp.status_code == 200
-    assert any(
-        "completion_status" in sql and params == (True, "mostly done", 6)
-        for sql, params in conn.cursor_obj.queries
-    )
-
-
-def test_done_todo_defaults_to_skipped_for_sleep_task(client, monkeypatch):
-    from .conftest import FakeConnection
-
-    _freeze_time(monkeypatch, 12, 15)
-    conn = FakeConnection(rows=[("11:00 - 11:40", "Sleep early", "")])
-    monkeypatch.setattr(todo, "get_db_connection", lambda: conn)
-    monkeypatch.setattr(todo, "flash", lambda *a, **k: None)
-    _login_session(client, monkeypatch)
-
-    resp = client.post("/todo/mark_done", json={"id": 7, "completed": False})
-
-    assert resp.status_code == 200
-    assert any(
-        "completion_status" in sql and params == (True, "skipped", 7)
-        for sql, params in conn.cursor_obj.queries
-    )
-
-
-def test_done_todo_keeps_existing_status_on_auto_complete(client, monkeypatch):
-    from .conftest import FakeConnection
-
-    # Grace is over but the user already chose a status: never overwrite it.
-    _freeze_time(monkeypatch, 12, 15)
-    conn = FakeConnection(rows=[("11:00 - 11:40", "Math homework", "done")])
-    monkeypatch.setattr(todo, "get_db_connection", lambda: conn)
-    monkeypatch.setattr(todo, "flash", lambda *a, **k: None)
-    _login_session(client, monkeypatch)
-
-    resp = client.post("/todo/mark_done", json={"id": 8, "completed": False})
-
-    assert resp.status_code == 200
-    assert resp.get_json()["completion_status"] == "done"
-    update_queries = [
-        (sql, params)
-        for sql, params in conn.cursor_obj.queries
-        if "UPDATE todo_list" in sql
-    ]
-    assert update_queries == [
-        ("UPDATE todo_list SET completed = %s WHERE id = %s", (True, 8)),
-    ]
-
-
-def test_mark_status_success_within_grace(client, monkeypatch):
-    from .conftest import FakeConnection
 
+def test_mark_status_success_within_grace(frozen_now, client, use_todo_conn, monkeypatch):
     # Slot ended 12:00, now 12:15: inside the 30-min grace window.
-    _freeze_time(monkeypatch, 12, 15)
     conn = FakeConnection(
         rows=[("", "11:00 - 12:00", "kid", "Math", "2026-07-11 12:00:00")],
     )
-    monkeypatch.setattr(todo, "get_db_connection", lambda: conn)
-    monkeypatch.setattr(todo, "send_discord_notification", lambda *a, **k: None)
+    use_todo_conn(conn)
     monkeypatch.setattr(
         todo,
         "get_current_username",
-        lambda: SimpleNamespace(username="kid", role="user"),
+        lambda: KID,
     )
-    _login_session(client, monkeypatch)
+    login(client)
 
     resp = client.post("/todo/mark_status", json={"id": 1, "status": "mostly done"})
 
     assert resp.status_code == 200
     assert resp.get_json()["success"] is True
-    assert any(
-        "completion_status = %s" in sql and params == ("mostly done", True, 1)
-        for sql, params in conn.cursor_obj.queries
-    )
-
+    assert ("mostly done", True, 1) in sql_params(conn.cursor_obj.executed, "completion_status = %s")
 
-def test_mark_status_rejected_before_slot_end(client, monkeypatch):
-    from .conftest import FakeConnection
 
+def test_mark_status_rejected_before_slot_end(frozen_now, client, use_todo_conn, monkeypatch):
     # Slot ends 13:00, now 12:15: too early for a non-admin.
-    _freeze_time(monkeypatch, 12, 15)
     conn = FakeConnection(
         rows=[("", "12:00 - 13:00", "kid", "Math", "2026-07-11 12:00:00")],
     )
-    monkeypatch.setattr(todo, "get_db_connection", lambda: conn)
+    use_todo_conn(conn)
     monkeypatch.setattr(
         todo,
         "get_current_username",
-        lambda: SimpleNamespace(username="kid", role="user"),
+        lambda: KID,
     )
-    _login_session(client, monkeypatch)
+    login(client)
 
     resp = client.post("/todo/mark_status", json={"id": 2, "status": "mostly done"})
 
@@ -288,21 +194,18 @@ def test_mark_status_rejected_before_slot_end(client, monkeypatch):
     assert resp.get_json()["error"] == "too early"
 
 
-def test_mark_status_rejected_when_status_locked(client, monkeypatch):
-    from .conftest import FakeConnection
-
+def test_mark_status_rejected_when_status_locked(frozen_now, client, use_todo_conn, monkeypatch):
     # Status already chosen, non-admin cannot overwrite.
-    _freeze_time(monkeypatch, 12, 15)
     conn = FakeConnection(
         rows=[("done", "11:00 - 12:00", "kid", "Math", "2026-07-11 12:00:00")],
     )
-    monkeypatch.setattr(todo, "get_db_connection", lambda: conn)
+    use_todo_conn(conn)
     monkeypatch.setattr(
         todo,
         "get_current_username",
-        lambda: SimpleNamespace(username="kid", role="user"),
+        lambda: KID,
     )
-    _login_session(client, monkeypatch)
+    login(client)
 
     resp = client.post("/todo/mark_status", json={"id": 3, "status": "mostly done"})
 
@@ -310,22 +213,18 @@ def test_mark_status_rejected_when_status_locked(client, monkeypatch):
     assert resp.get_json()["error"] == "status locked"
 
 
-def test_mark_status_admin_can_override(client, monkeypatch):
-    from .conftest import FakeConnection
-
+def test_mark_status_admin_can_override(frozen_now, client, use_todo_conn, monkeypatch):
     # Admin can set status even before the slot ends and overwrite an existing one.
-    _freeze_time(monkeypatch, 12, 15)
     conn = FakeConnection(
         rows=[("done", "12:00 - 13:00", "kid", "Math", "2026-07-11 12:00:00")],
     )
-    monkeypatch.setattr(todo, "get_db_connection", lambda: conn)
-    monkeypatch.setattr(todo, "send_discord_notification", lambda *a, **k: None)
+    use_todo_conn(conn)
     monkeypatch.setattr(
         todo,
         "get_current_username",
-        lambda: SimpleNamespace(username="admin", role="admin"),
+        lambda: ADMIN,
     )
-    _login_session(client, monkeypatch)
+    login(client)
 
     resp = client.post("/todo/mark_status", json={"id": 4, "status": "skipped"})
 
@@ -333,31 +232,29 @@ def test_mark_status_admin_can_override(client, monkeypatch):
     assert resp.get_json()["success"] is True
 
 
-def test_todo_page_uses_parameterized_date(client, monkeypatch):
-    cursor = SeqCursor(
+def test_todo_page_uses_parameterized_date(client, use_todo_conn, monkeypatch):
+    conn = FakeConnection(
         fetchone_values=[("user", "1")],
         fetchall_values=[
             [],  # today_tasks
             [],  # week strip / heatmap history
         ],
     )
-    conn = SeqConnection(cursor)
-    monkeypatch.setattr(todo, "get_db_connection", lambda: conn)
+    use_todo_conn(conn)
     monkeypatch.setattr(todo, "get_agile_config", lambda k, d="": d)
     monkeypatch.setattr(
         todo,
         "get_current_username",
-        lambda: SimpleNamespace(username="user", role="user"),
+        lambda: USER,
     )
-    monkeypatch.setattr(todo, "render_template", lambda *a, **k: ("ok", 200))
-    _login_session(client, monkeypatch)
+    login(client)
 
     resp = client.get("/todo")
 
     assert resp.status_code == 200
     # Verify that the SELECT query uses %s for date and passes a date object
     found_query = False
-    for sql, params in cursor.queries:
+    for sql, params in conn.cursor_obj.executed:
         if "SELECT id, time_slot, task, completed" in sql:
             assert "WHERE date = %s" in sql
             from datetime import date
@@ -7,97 +7,62 @@ import pytest
 from src.safe_family.todo.todo import generate_time_slots
 from src.safe_family.urls.analyzer import get_time_range
 
-
-def test_generate_time_slots_weekday_half_hour():
-    weekday = datetime(2025, 1, 6, 12, 0)  # Monday
-    slots = generate_time_slots(
-        slot_type="30",
-        schedule_mode="weekday",
-        custom_start="",
-        custom_end="",
-        today=weekday,
-    )
-    assert slots[0] == "18:30 - 19:00"
-    assert slots[-1] == "21:00 - 21:30"
-    assert len(slots) == 6
-
-
-def test_generate_time_slots_weekend_hour():
-    weekend = datetime(2025, 1, 4, 12, 0)  # Saturday
-    slots = generate_time_slots(
-        slot_type="60",
-        schedule_mode="weekday",
-        custom_start="",
-        custom_end="",
-        today=weekend,
-    )
-    assert slots[0] == "09:00 - 10:00"
-    assert slots[-1] == "16:00 - 17:00"
-    assert len(slots) == 8
-
-
-def test_generate_time_slots_custom_invalid_falls_back():
-    weekday = datetime(2025, 1, 6, 12, 0)  # Monday
-    slots = generate_time_slots(
-        slot_type="60",
-        schedule_mode="custom",
-        custom_start="bad",
-        custom_end="bad",
-        today=weekday,
-    )
-    assert slots
-
-
-def test_generate_time_slots_custom_bad_format_falls_back():
-    weekday = datetime(2025, 1, 6, 12, 0)  # Monday
+MONDAY = datetime(2025, 1, 6, 12, 0)
+SATURDAY = datetime(2025, 1, 4, 12, 0)
+# Custom ranges that fail validation fall back to the weekday evening hours.
+WEEKDAY_FALLBACK = ("18:30 - 19:30", "20:30 - 21:30", 3)
+
+
+@pytest.mark.parametrize(
+    ("slot_type", "schedule_mode", "custom", "today", "expected"),
+    [
+        ("30", "weekday", ("", ""), MONDAY, ("18:30 - 19:00", "21:00 - 21:30", 6)),
+        ("60", "weekday", ("", ""), SATURDAY, ("09:00 - 10:00", "16:00 - 17:00", 8)),
+        ("60", "custom", ("bad", "bad"), MONDAY, WEEKDAY_FALLBACK),
+        ("60", "custom", ("08:00:00", "09:00"), MONDAY, WEEKDAY_FALLBACK),
+        ("60", "custom", ("10:00", "09:00"), MONDAY, WEEKDAY_FALLBACK),
+        ("30", "custom", ("08:00", "09:00"), MONDAY, ("08:00 - 08:30", "08:30 - 09:00", 2)),
+    ],
+    ids=[
+        "weekday-half-hour",
+        "weekend-hour",
+        "custom-invalid",
+        "custom-bad-format",
+        "custom-end-before-start",
+        "custom-valid",
+    ],
+)
+def test_generate_time_slots(slot_type, schedule_mode, custom, today, expected):
     slots = generate_time_slots(
-        slot_type="60",
-        schedule_mode="custom",
-        custom_start="08:00:00",
-        custom_end="09:00",
-        today=weekday,
-    )
-    assert slots[0] == "18:30 - 19:30"
-
-
-def test_generate_time_slots_custom_end_before_start_falls_back():
-    weekday = datetime(2025, 1, 6, 12, 0)  # Monday
-    slots = generate_time_slots(
-        slot_type="60",
-        schedule_mode="custom",
-        custom_start="10:00",
-        custom_end="09:00",
-        today=weekday,
-    )
-    assert slots[0] == "18:30 - 19:30"
-
-
-def test_generate_time_slots_custom_valid():
-    weekday = datetime(2025, 1, 6, 12, 0)  # Monday
-    slots = generate_time_slots(
-        slot_type="30",
-        schedule_mode="custom",
-        custom_start="08:00",
-        custom_end="09:00",
-        today=weekday,
-    )
-    assert slots[0] == "08:00 - 08:30"
-    assert slots[-1] == "08:30 - 09:00"
-
-
-def test_get_time_range_last_hour_uses_midnight_start():
-    now = datetime(2025, 1, 2, 15, 30)
-    start_time, end_time = get_time_range(time_range="last_hour", now=now)
-    assert start_time.strftime("%Y-%m-%d %H:%M:%S") == "2025-01-02 00:00:00"
-    assert end_time.strftime("%Y-%m-%d %H:%M:%S") == "2025-01-02 14:30:00"
-
-
-def test_get_time_range_custom_valid():
-    start_time, end_time = get_time_range(
-        custom=("2025-01-02T10:00:00", "2025-01-02T11:00:00"),
+        slot_type=slot_type,
+        schedule_mode=schedule_mode,
+        custom_start=custom[0],
+        custom_end=custom[1],
+        today=today,
     )
-    assert start_time.strftime("%H:%M:%S") == "10:00:00"
-    assert end_time.strftime("%H:%M:%S") == "11:00:00"
+    assert (slots[0], slots[-1], len(slots)) == expected
+
+
+@pytest.mark.parametrize(
+    ("kwargs", "expected"),
+    [
+        (
+            {"time_range": "last_hour", "now": datetime(2025, 1, 2, 15, 30)},
+            ("2025-01-02 00:00:00", "2025-01-02 14:30:00"),
+        ),
+        (
+            {"custom": ("2025-01-02T10:00:00", "2025-01-02T11:00:00")},
+            ("2025-01-02 10:00:00", "2025-01-02 11:00:00"),
+        ),
+    ],
+    ids=["last-hour-uses-midnight-start", "custom-valid"],
+)
+def test_get_time_range(kwargs, expected):
+    start_time, end_time = get_time_range(**kwargs)
+    assert (
+        start_time.strftime("%Y-%m-%d %H:%M:%S"),
+        end_time.strftime("%Y-%m-%d %H:%M:%S"),
+    ) == expected
 
 
 def test_get_time_range_invalid_raises():
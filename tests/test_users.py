@@ -7,13 +7,15 @@ import pytest
 from src.safe_family.users import users
 
 
-@pytest.fixture(autouse=True)
-def patch_jwt(monkeypatch):
-    """Bypass JWT verification for tests."""
-    monkeypatch.setattr(
-        "flask_jwt_extended.view_decorators.verify_jwt_in_request",
-        lambda *a, **k: None,
-    )
+@pytest.fixture(scope="module", autouse=True)
+def patch_jwt():
+    """Bypass JWT verification once for every test in this module."""
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(
+            "flask_jwt_extended.view_decorators.verify_jwt_in_request",
+            lambda *a, **k: None,
+        )
+        yield
 
 
 def test_get_all_users_admin(client, monkeypatch):